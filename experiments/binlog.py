@@ -0,0 +1,63 @@
+"""Decoder for the binary log format served by /api/log/?format=bin.
+
+The layout is documented in firmware/app/graph.py and must be kept in step with it.
+"""
+
+import math
+import struct
+from datetime import datetime
+
+MAGIC = b"IRG1"
+RECORD = "<IH5B2fB"
+RECORD_SIZE = struct.calcsize(RECORD)
+HEADER_SIZE = len(MAGIC) + 2
+
+
+class FormatError(Exception):
+    pass
+
+
+def _float(x: float):
+    return None if math.isnan(x) else round(x, 2)
+
+
+def decode(buf: bytes) -> list:
+    """Decode a binary log response into a list of records like the JSON api."""
+    if buf[: len(MAGIC)] != MAGIC:
+        raise FormatError("Bad magic, is the server running an old version?")
+    (record_size,) = struct.unpack_from("<H", buf, len(MAGIC))
+    if record_size != RECORD_SIZE:
+        raise FormatError(f"Unsupported record size {record_size}.")
+    body = memoryview(buf)[HEADER_SIZE:]
+    if len(body) % RECORD_SIZE:
+        raise FormatError("Truncated response.")
+
+    records = []
+    for id_, *ts, temperature, humidity, flags in struct.iter_unpack(RECORD, body):
+        records.append(
+            {
+                "id": id_,
+                "timestamp": datetime(*ts),
+                "soil_temperature": _float(temperature),
+                "soil_humidity": _float(humidity),
+                "valve": bool(flags & 1),
+                "watering": bool(flags & 2),
+                "auto_mode": bool(flags & 4),
+            }
+        )
+    return records
+
+
+def fetch(hostname: str, session=None, **params) -> list:
+    """Fetch and decode records from the device.
+
+    params are passed through as the query string, e.g. n/skip or
+    since_id/until_id/limit.
+    """
+    import requests
+
+    session = session or requests
+    params["format"] = "bin"
+    resp = session.get(f"http://{hostname}/api/log/", params=params)
+    resp.raise_for_status()
+    return decode(resp.content)
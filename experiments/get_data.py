@@ -1,17 +1,46 @@
 #!/usr/bin/env python3
+"""Incrementally sync readings from the controller into a local SQLite store."""
 
 import json
-import operator
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 from sys import stdout
 
 import requests
+from requests.adapters import HTTPAdapter
 
-HOSTNAME = "irrigation.lan"
-logf = Path(__file__).parent / "data.json"
-
+import binlog
 
-data = None
+HOSTNAME = "irrigation.lan"
+PAGE = 256
+WORKERS = 4
+dbf = Path(__file__).parent / "data.sqlite"
+logf = Path(__file__).parent / "data.json"  # old store, imported once if present
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    soil_temperature REAL,
+    soil_humidity REAL,
+    valve INTEGER,
+    watering INTEGER,
+    auto_mode INTEGER
+);
+CREATE INDEX IF NOT EXISTS readings_timestamp ON readings (timestamp);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+"""
+FIELDS = (
+    "id",
+    "timestamp",
+    "soil_temperature",
+    "soil_humidity",
+    "valve",
+    "watering",
+    "auto_mode",
+)
 
 
 def flushprint(*args, **kwargs):
@@ -23,133 +52,139 @@ def flushprint(*args, **kwargs):
     stdout.flush()
 
 
-class DataExhaustedError(Exception):
-    pass
+def epoch(t: datetime) -> int:
+    """Device time is naive local time: store it as if it were UTC."""
+    return int(t.replace(tzinfo=timezone.utc).timestamp())
 
 
-class DataValidityError(Exception):
-    pass
+class Store:
+    """Readings stored in SQLite, keyed on id and indexed on timestamp."""
 
+    def __init__(self, fn: Path):
+        self.db = sqlite3.connect(fn)
+        self.db.executescript(SCHEMA)
 
-def load():
-    global data
-    try:
-        with logf.open() as f:
+    def newest(self):
+        return self.db.execute("SELECT max(id) FROM readings").fetchone()[0]
+
+    def oldest(self):
+        return self.db.execute("SELECT min(id) FROM readings").fetchone()[0]
+
+    @property
+    def backfilled(self) -> bool:
+        """Whether backfill has reached the oldest record the device had."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'backfilled'")
+        return bool((row.fetchone() or [False])[0])
+
+    @backfilled.setter
+    def backfilled(self, v: bool):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('backfilled', ?)", (v,))
+        self.db.commit()
+
+    def add(self, records: list) -> int:
+        """Add records, ignoring any we already have.  Returns the number added."""
+        before = self.db.total_changes
+        self.db.executemany(
+            f"INSERT OR IGNORE INTO readings VALUES ({', '.join('?' * len(FIELDS))})",
+            (
+                tuple(epoch(x[k]) if k == "timestamp" else x[k] for k in FIELDS)
+                for x in records
+            ),
+        )
+        self.db.commit()
+        return self.db.total_changes - before
+
+    def import_json(self, fn: Path):
+        """Import a data.json written by the old collector."""
+        with fn.open() as f:
             data = json.load(f)
-    except FileNotFoundError:
-        data = []
-
-
-def save():
-    with logf.open("w") as f:
-        json.dump(data, f)
-
-
-def ids():
-    return (x["id"] for x in data)
-
-
-def get(skip=0, n=None):
-    url = "http://" + HOSTNAME + f"/api/log/?skip={skip}"
-    if n:
-        url += f"&n={n}"
-    return requests.get(url).json()
-
-
-def find_offset(target_id):
-    last_id = None
-    skip = sum(1 for x in ids() if x > target_id)
-    while True:
-        id_ = get(skip, 1)[0]["id"]
-        if id_ == last_id:
-            raise DataExhaustedError(f"Data exhausted when looking for {target_id}.")
-        if id_ == target_id:
-            break
-        skip += id_ - target_id
-        last_id = id_
-    return skip
-
-
-def fetch_new():
-    global data
-    skip = 0
-    flushprint("Getting new records", end="")
-    while True:
-        flushprint(".", end="")
-        newest = max(ids())
-        records = get(skip)
-        new_records = [x for x in records if x["id"] > newest]
-        if not new_records:
-            break
-        data += new_records
-        skip += len(records)
-
-    data.sort(key=operator.itemgetter("id"))
-    flushprint("")
+        for x in data:
+            x["timestamp"] = datetime(*x["timestamp"][:6])
+        return self.add(data)
 
-    try:
-        skip = find_offset(min(ids()))
-    except DataExhaustedError:
-        return
-
-    flushprint("Getting old records", end="")
-    while True:
-        flushprint(".", end="")
-        oldest = min(ids())
-        records = get(skip)
-        new_records = [x for x in records if x["id"] < oldest]
-        if not new_records:
-            break
-        data += new_records
-        skip += len(records)
 
-    flushprint("")
+def session() -> requests.Session:
+    s = requests.Session()
+    s.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=WORKERS))
+    return s
 
-    data.sort(key=operator.itemgetter("id"))
 
+def get(s, since_id=None, until_id=None, limit=PAGE):
+    params = {"limit": limit}
+    if since_id is not None:
+        params["since_id"] = since_id
+    if until_id is not None:
+        params["until_id"] = until_id
+    return binlog.fetch(HOSTNAME, session=s, **params)
 
-def fetch_one(id_) -> dict:
-    skip = find_offset(id_)
-    resp = get(skip, 1)[0]
-    if resp["id"] != id_:
-        raise DataValidityError("Server returned wrong record!")
-    return resp
 
+def windows(start: int, end: int):
+    """Split ids in (start, end] into pages."""
+    return [(since, min(since + PAGE, end)) for since in range(start, end, PAGE)]
 
-def patch():
-    """Workaround possible race condition where offset changes mid-fetch."""
-    global data
 
-    all_ids = list(ids())
-    next_ids = iter(all_ids)
-    next(next_ids)
-    missing_ids = [id_ for id_, next_id in zip(all_ids, next_ids) if next_id - id_ > 1]
-    flushprint(f"Fetching {len(missing_ids)} missing records.")
-    missing = []
-    ATTEMPTS = 5
-    for id_ in missing_ids:
-        for _ in range(ATTEMPTS):
-            try:
-                missing.append(fetch_one(id_))
+def fetch_new(store: Store, s, newest: int):
+    """Fetch everything newer than the store, oldest page first.
+
+    Pages are fetched concurrently but added in order, so an interrupted sync
+    leaves the store without holes.
+    """
+    pages = windows(store.newest(), newest)
+    flushprint(f"Getting {len(pages)} pages of new records", end="")
+    added = 0
+    with ThreadPoolExecutor(WORKERS) as pool:
+        for records in pool.map(lambda w: get(s, *w), pages):
+            added += store.add(records)
+            flushprint(".", end="")
+    flushprint("")
+    return added
+
+
+def backfill(store: Store, s, until: int):
+    """Fetch all the history the device still has up to until, newest first.
+
+    The store's oldest id is the low-water mark: pages are added newest
+    first, so an interrupted backfill resumes below it on the next sync.
+    """
+    flushprint("Getting history", end="")
+    added = 0
+    with ThreadPoolExecutor(WORKERS) as pool:
+        while until >= 0:
+            pages = [
+                (max(u - PAGE, -1), u)
+                for u in range(until, max(until - PAGE * WORKERS, -1), -PAGE)
+            ]
+            batch = list(pool.map(lambda w: get(s, *w), pages))
+            if not any(batch):
                 break
-            except DataValidityError:
-                continue
-    data += missing
-    data.sort(key=operator.itemgetter("id"))
+            for records in batch:
+                added += store.add(records)
+            until = pages[-1][0]
+            flushprint(".", end="")
+    store.backfilled = True
+    flushprint("")
+    return added
 
 
-def setup():
-    global data
-    if not data:
-        data = get()
+def sync(store: Store):
+    s = session()
+    head = get(s, limit=1)
+    if not head:
+        return 0
+    newest = head[0]["id"]
+    if store.newest() is None:
+        return backfill(store, s, newest)
+    added = fetch_new(store, s, newest)
+    if not store.backfilled:
+        added += backfill(store, s, store.oldest() - 1)
+    return added
 
 
 def main():
-    load()
-    setup()
-    fetch_new()
-    patch()
-    save()
+    store = Store(dbf)
+    if store.newest() is None and logf.exists():
+        flushprint(f"Imported {store.import_json(logf)} records from {logf.name}")
+    flushprint(f"Added {sync(store)} records.")
 
 
 if __name__ == "__main__":
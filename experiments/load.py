@@ -1,7 +1,32 @@
+"""Load readings for analysis.
+
+`load` reads a legacy data.json.  `load_columns` reads the SQLite store kept by
+get_data.py into a memory-mapped structured array, cached on disk and extended
+incrementally as new records arrive.
+"""
+
 import json
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
+dbf = Path(__file__).parent / "data.sqlite"
+cachef = Path(__file__).parent / "readings.bin"
+
+DTYPE = np.dtype(
+    [
+        ("id", "<u4"),
+        ("timestamp", "<M8[s]"),
+        ("soil_temperature", "<f4"),
+        ("soil_humidity", "<f4"),
+        ("valve", "?"),
+        ("watering", "?"),
+        ("auto_mode", "?"),
+    ]
+)
+
 
 def load(fn: Path):
     with fn.open() as f:
@@ -9,3 +34,57 @@ def load(fn: Path):
     for record in data:
         record["timestamp"] = datetime(*record["timestamp"][:-1])
     return data
+
+
+def _cached(cache: Path):
+    """Return the cache as a read-only memmap, or None if it is missing or bad."""
+    try:
+        size = cache.stat().st_size
+    except FileNotFoundError:
+        return None
+    if not size or size % DTYPE.itemsize:
+        return None
+    return np.memmap(cache, dtype=DTYPE, mode="r")
+
+
+def _rows(db: Path, after: int) -> np.ndarray:
+    """Fetch rows newer than `after` as a structured array, without a per-row loop."""
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(DTYPE.names)} FROM readings WHERE id > ? ORDER BY id",
+            (after,),
+        ).fetchall()
+    # NULL readings become NaN in the float conversion
+    raw = np.array(rows, dtype=np.float64).reshape(-1, len(DTYPE.names))
+    out = np.empty(len(raw), dtype=DTYPE)
+    for i, name in enumerate(DTYPE.names):
+        if name == "timestamp":
+            out[name] = raw[:, i].astype(np.int64).astype("M8[s]")
+        else:
+            out[name] = raw[:, i]
+    return out
+
+
+def refresh(db: Path = dbf, cache: Path = cachef) -> int:
+    """Append records newer than the cache to it.  Returns the number added."""
+    cached = _cached(cache)
+    if cached is None:
+        cache.unlink(missing_ok=True)
+        last = -1
+    else:
+        last = int(cached["id"][-1])
+        del cached
+    new = _rows(db, last)
+    if len(new):
+        with cache.open("ab") as f:
+            f.write(new.tobytes())
+    return len(new)
+
+
+def load_columns(db: Path = dbf, cache: Path = cachef) -> np.memmap:
+    """Refresh the cache and memory-map it.
+
+    Columns are accessed by name, e.g. `data["soil_humidity"]`.
+    """
+    refresh(db, cache)
+    return _cached(cache)
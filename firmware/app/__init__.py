@@ -14,9 +14,25 @@ except ImportError:
         return x
 
 
-if upython:
-    from sys import print_exception
+try:
+    from time import ticks_diff, ticks_ms, ticks_us
+except ImportError:
+    from time import monotonic
+
+    def ticks_ms():
+        """Wrapper fn for micropython's ticks_ms."""
+        return int(monotonic() * 1_000)
+
+    def ticks_us():
+        """Wrapper fn for micropython's ticks_us."""
+        return int(monotonic() * 1_000_000)
 
+    def ticks_diff(a, b):
+        """Wrapper fn for micropython's ticks_diff."""
+        return a - b
+
+
+if upython:
     import uasyncio as asyncio
     import uos
 
@@ -53,6 +69,26 @@ async def run(x: callable):
     return x
 
 
+async def _save_boot_profile(reason):
+    """Mark the loop as running and save the boot profile."""
+    from . import bootprof
+
+    bootprof.mark("run loop")
+    bootprof.save(reason)
+
+
+def reset():
+    """Flush anything pending to flash and reset."""
+    import machine
+
+    from . import log
+    from .settings import settings
+
+    log.queue_handler.flush()
+    settings.flush()
+    machine.reset()
+
+
 def start(logger):
     """Start the app."""
     print("Starting up")
@@ -74,53 +110,64 @@ def start(logger):
     reset_cause = reset_causes[machine.reset_cause() - 1]
     logger.info("Booting up, reason is {}".format(reset_cause))
 
+    from . import bootprof
+
+    bootprof.mark("start")
+    print("Loading wifi")
+    from . import wifi
+
     print("Loading Hal")
     from . import hal
 
     gc.collect()
+    bootprof.mark("import hal")
     print("Loading clock")
     from . import clock
 
     gc.collect()
+    bootprof.mark("import clock")
     print("Loading api")
     from . import api
 
     gc.collect()
+    bootprof.mark("import api")
     print("Loading irrigation")
     from . import irrigation
 
+    bootprof.mark("import irrigation")
+
     print("Initialising...")
     loop = asyncio.get_event_loop()
+    from . import lagmon, log, schedule
+    from .settings import settings
+
+    if settings.get("profile_tasks", False):
+        from . import tasks
+
+        tasks.install()
+    settings.init(loop)
+    log.init(loop)
+    schedule.init(loop)
+    lagmon.init(loop)
+    wifi.init(loop)
     api.init(loop)
     clock.init(loop)
     gc.collect()
-    print("Syncing clock...")
-    i = 0
-    while i < 10 and not clock.clock_synced():
-        try:
-            clock.ntptime.settime()
-        except (OverflowError, OSError) as e:
-            print("Failed to sync")
-            print(clock.rtc.datetime())
-            print_exception(e)
-            sleep(1)
-            i += 1
-    if i == 100:
-        logger.warning("Failed to sync clock.")
-    if clock.clock_synced():
-        clock.boot_time = clock.localtime()
+    bootprof.mark("init services")
 
     hal.init(loop)
     irrigation.init(loop)
     gc.collect()
     gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+    bootprof.mark("init hardware")
 
-    logger.info("Everything started.")
+    logger.info("Everything started after {}ms.".format(ticks_ms()))
     loop.create_task(wait_safe())
+    loop.create_task(_save_boot_profile(reset_cause))
 
     try:
         loop.run_forever()
     finally:
         print("Loop ended")
         sleep(60)
-        machine.reset()
+        reset()
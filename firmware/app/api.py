@@ -1,6 +1,6 @@
-import gc
 import logging
 import re
+from time import localtime, mktime
 
 from . import run, upython
 
@@ -8,20 +8,57 @@ if upython:
     from sys import print_exception
 
     import uasyncio as asyncio
-    import ujson as json
-    import utemplate.recompile
 else:
     import asyncio
-    import json
 
 import picoweb
 
-from . import clock, graph, hal, irrigation, log
+from . import (
+    bootprof,
+    clock,
+    events,
+    graph,
+    hal,
+    irrigation,
+    jsonstream,
+    lagmon,
+    log,
+    metrics,
+    status,
+    tasks,
+)
 from .settings import settings
-from .util import convert_vals
+from .util import convert_vals, id_window, window
+from .writer import BufferedWriter
 
-app = picoweb.WebApp(__name__)
-app.template_loader = utemplate.recompile.Loader(app.pkg, "templates")
+try:
+    from .assets import ASSETS, GZIPPED
+except ImportError:  # assets not built, serve the originals
+    ASSETS = {}
+    GZIPPED = set()
+
+_FINGERPRINTED = set(ASSETS.values())
+
+# picoweb's own static route would otherwise be added first and shadow
+# static() below, so /static/build/... would never be gzipped or cached
+app = picoweb.WebApp(__name__, serve_static=False)
+
+
+def _template_loader():
+    """Use precompiled templates if built, else compile them at runtime."""
+    try:
+        import utemplate.compiled
+
+        loader = utemplate.compiled.Loader(app.pkg, "templates")
+        loader.load("index.html")
+    except ImportError:
+        import utemplate.recompile
+
+        loader = utemplate.recompile.Loader(app.pkg, "templates")
+    return loader
+
+
+app.template_loader = _template_loader()
 logger = logging.getLogger(__name__)
 
 
@@ -58,38 +95,125 @@ def cors(f):
     return _cors
 
 
-@app.route("/")
+def route(url, name=None):
+    """Add a route, recording metrics under name (or url if it is a string)."""
+
+    def _route(f):
+        return app.route(url)(metrics.timed(name or url, f))
+
+    return _route
+
+
+def asset(name):
+    """Get the url of a static file, fingerprinted if it has been built."""
+    return "static/" + ASSETS.get(name, name)
+
+
+@route("/")
 async def index(req, resp):
-    await picoweb.start_response(resp, content_type="text/html")
-    await app.render_template(resp, "index.html", (_report_status(),))
+    async with BufferedWriter(resp) as w:
+        await picoweb.start_response(w, content_type="text/html")
+        await app.render_template(w, "index.html", (status.report(), asset))
+
+
+@route(re.compile("^/static/(.+)"), "/static/")
+async def static(req, resp):
+    """Serve static files, gzipped if possible and cached forever if fingerprinted."""
+    path = req.url_match.group(1)
+    if ".." in path:
+        await picoweb.http_error(resp, "404")
+        return
+    headers = {"Vary": "Accept-Encoding"}
+    fn = "static/" + path
+    if path in _FINGERPRINTED:
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    if path in GZIPPED and b"gzip" in req.headers.get(b"Accept-Encoding", b""):
+        fn += ".gz"
+        headers["Content-Encoding"] = "gzip"
+    await app.sendfile(resp, fn, picoweb.get_mime_type(path), headers)
 
 
 async def json_response(resp, data: dict, headers=None, status=200):
     """Return a JSON response."""
-    await picoweb.start_response(
-        resp, content_type="application/json", headers=headers, status=status
-    )
-    await resp.awrite(json.dumps(data))
+    async with BufferedWriter(resp) as w:
+        await picoweb.start_response(
+            w, content_type="application/json", headers=headers, status=status
+        )
+        await jsonstream.dump(data, w)
 
 
-@app.route(re.compile("/api/status/(.*|)"))
+@route(re.compile("/api/status/(.*|)"), "/api/status/")
 @cors
 async def format_status(req, resp, headers=None):
-    """Return general status."""
-    status = "200"
+    """Return general status, or 304 if unchanged since the client's copy."""
+    headers = headers or {}
+    etag = status.etag()
+    headers["ETag"] = etag
+    if req.headers.get(b"If-None-Match") == etag.encode():
+        await picoweb.start_response(resp, status="304", headers=headers)
+        return
+
+    key = req.url_match.group(1)
+    if key:
+        code = "200"
+        try:
+            state = status.report()[key]
+        except Exception as e:
+            print_exception(e)
+            state = {"error": e}
+            code = "500"
+        await json_response(resp, state, headers, code)
+        return
+
+    async with BufferedWriter(resp) as w:
+        await picoweb.start_response(w, content_type="application/json", headers=headers)
+        await w.awrite(status.encoded())
+
+
+# not timed: the stream stays open for as long as the client listens
+@app.route("/api/events")
+@cors
+async def event_stream(req, resp, headers=None):
+    """Stream readings and state changes as server-sent events."""
+    sub = events.broker.subscribe()
+    if not sub:
+        await json_response(resp, {"error": "Too many subscribers."}, headers, "503")
+        return
+    headers = headers or {}
+    headers["Cache-Control"] = "no-cache"
     try:
-        state = _report_status()
-        if req.url_match.group(1):
-            state = state[req.url_match.group(1)]
-    except Exception as e:
-        print_exception(e)
-        state = {"error": e}
-        status = "500"
+        await picoweb.start_response(
+            resp, content_type="text/event-stream", headers=headers
+        )
+        await events.broker.stream(sub, resp.awrite)
+    except (OSError, asyncio.TimeoutError):
+        logger.debug("Event stream closed")
+    finally:
+        events.broker.unsubscribe(sub)
+
 
-    await json_response(resp, state, headers, status)
+def _publish_reading(sensor):
+    events.broker.publish(
+        "reading",
+        {"soil_temperature": sensor.temperature, "soil_humidity": sensor.humidity},
+    )
+
+
+def _publish_valve(valve):
+    events.broker.publish("valve", {"valve": valve.current_state})
+
+
+def _publish_watering(waterer):
+    events.broker.publish(
+        "watering", {"watering": waterer.watering(), "name": waterer.name}
+    )
+
+
+def _publish_setting(k, v):
+    events.broker.publish("setting", {k: v})
 
 
-@app.route("/api/self-test/")
+@route("/api/self-test/")
 async def selftest(req, resp, headers=None):
     """Run self-test routine."""
     try:
@@ -99,11 +223,7 @@ async def selftest(req, resp, headers=None):
         await app.sendfile(resp, "/app/static/test.log")
     except Exception as e:
         print_exception(e)
-        state = {"exception": e}
-        await picoweb.start_response(
-            resp, content_type="application/json", headers=headers
-        )
-        await resp.awrite(json.dumps(state))
+        await json_response(resp, {"exception": e}, headers)
 
 
 async def settable(f, req, resp, headers=None):
@@ -134,7 +254,7 @@ def property_wrapper(obj, prop):
     return f
 
 
-@app.route(re.compile("/api/auto-mode/([Tt]rue|[Ff]alse|)"))
+@route(re.compile("/api/auto-mode/([Tt]rue|[Ff]alse|)"), "/api/auto-mode/")
 @cors
 async def auto_mode(req, resp, headers=None):
     """Turn auto mode on or off."""
@@ -143,28 +263,28 @@ async def auto_mode(req, resp, headers=None):
     )
 
 
-@app.route(re.compile("/api/watering/([Tt]rue|[Ff]alse|)"))
+@route(re.compile("/api/watering/([Tt]rue|[Ff]alse|)"), "/api/watering/")
 @cors
 async def watering(req, resp, headers=None):
     """Turn watering mode on or off."""
     await settable(irrigation.auto_waterer.watering, req, resp, headers)
 
 
-@app.route(re.compile("/api/valve/([Tt]rue|[Ff]alse|)"))
+@route(re.compile("/api/valve/([Tt]rue|[Ff]alse|)"), "/api/valve/")
 @cors
 async def control_valve(req, resp, headers=None):
     """Turn valve on or off."""
     await settable(hal.valve.state, req, resp, headers)
 
 
-@app.route("/api/settings/")
+@route("/api/settings/")
 @cors
 async def allsettings(req, resp, headers=None):
     """Get all settings."""
     await json_response(resp, settings.settings, headers)
 
 
-@app.route(re.compile("^/api/settings/(.+)/(.*)"))
+@route(re.compile("^/api/settings/([^/]+)/(.*)"), "/api/settings/<key>/")
 @cors
 async def setting(req, resp, headers=None):
     """Get or set a particular setting."""
@@ -191,71 +311,180 @@ async def setting(req, resp, headers=None):
     await json_response(resp, data, headers, status)
 
 
-@app.route("/api/log/")
+ID_SLACK = 2  # extra records read when seeking by id, in case of a concurrent append
+
+
+def _query_int(req, k, default=None):
+    return int(req.form[k]) if k in req.form else default
+
+
+def _read_log(req, read, get_id):
+    """Read records from a rotating log, paginated by offset or by id.
+
+    `n`/`skip` select records by offset from the newest.  `since_id`
+    (exclusive), `until_id` (inclusive) and `limit` select by id, seeking
+    straight to the right offset rather than scanning.
+    """
+    limit = _query_int(req, "limit", _query_int(req, "n", 20))
+    since_id = _query_int(req, "since_id")
+    until_id = _query_int(req, "until_id")
+    if since_id is None and until_id is None:
+        return read(n=limit, skip=_query_int(req, "skip", 0))
+
+    newest = next(iter(read(n=1, skip=0)), None)
+    if newest is None:
+        return iter(())
+    newest_id = get_id(newest)
+    n, skip = id_window(newest_id, since_id, until_id, limit)
+    if not n:
+        return iter(())
+    # bound by the newest id seen so a record appended since doesn't use up n
+    until_id = newest_id if until_id is None else min(until_id, newest_id)
+    return window(read(n=n + ID_SLACK, skip=skip), get_id, since_id, until_id, n)
+
+
+def _reading_id(reading):
+    return reading.id
+
+
+def _query_level(req):
+    """Parse a level given by number or name, e.g. level=40 or level=ERROR."""
+    level = req.form.get("level", logging.NOTSET)
+    try:
+        return int(level)
+    except ValueError:
+        pass
+    level = logging.getLevelName(level.upper())
+    if not isinstance(level, int):
+        raise ValueError("Unknown level")
+    return level
+
+
+def _query_time(req, k):
+    """Parse a time given in seconds or as e.g. 2021-09-01T06:00:00."""
+    if k not in req.form:
+        return None
+    v = req.form[k]
+    try:
+        return int(v)
+    except ValueError:
+        pass
+    date, _, time = v.replace("T", " ").partition(" ")
+    fields = [int(x) for x in date.split("-")] + [int(x) for x in time.split(":") if x]
+    fields += [0] * (6 - len(fields))
+    return mktime(tuple(fields[:6]) + (0, 0))
+
+
+def _wants_binary(req):
+    if req.form.get("format") == "bin":
+        return True
+    return b"application/octet-stream" in req.headers.get(b"Accept", b"")
+
+
+async def _graph_log_bin(w, readings, headers=None):
+    """Stream log records in the fixed layout documented in `graph`."""
+    await picoweb.start_response(
+        w, content_type="application/octet-stream", headers=headers
+    )
+    await w.awrite(graph.HEADER)
+    for reading in readings:
+        graph.pack_into(w.buf, await w.claim(graph.RECORD_SIZE), reading)
+
+
+@route("/api/log/")
 @cors
 async def graph_log(req, resp, headers=None):
-    """Get log of values for graph."""
+    """Get log of values for graph, as JSON or (with format=bin) packed records."""
     req.parse_qs()
-    n = int(req.form["n"]) if "n" in req.form else 20
-    skip = int(req.form["skip"] if "skip" in req.form else 0)
-
-    await picoweb.start_response(resp, content_type="application/json", headers=headers)
-    await resp.awrite("[")
-    started = False
-    for reading in graph.packer.read(n=n, skip=skip):
-        if started:
-            await resp.awrite(",")
-        enc = {
-            "soil_temperature": reading.floats[0],
-            "soil_humidity": reading.floats[1],
-            "valve": reading.bools[0],
-            "watering": reading.bools[1],
-            "auto_mode": reading.bools[2],
-            "timestamp": reading.timestamp,
-            "id": reading.id,
-        }
-        await resp.awrite("{}".format(json.dumps(enc)))
-        started = True
-    await resp.awrite("]")
-    gc.collect()
-
-
-@app.route("/api/syslog/")
-@cors
-async def syslog(req, resp, headers=None):
-    """Get syslog."""
-    req.parse_qs()
-    n = int(req.form["n"]) if "n" in req.form else 20
-    skip = int(req.form["skip"] if "skip" in req.form else 0)
+    readings = _read_log(req, graph.packer.read, _reading_id)
 
-    await picoweb.start_response(resp, content_type="application/json", headers=headers)
-    await resp.awrite("[")
-    started = False
-    for i, timestamp, line in log.rotating_log.read(n=n, skip=skip):
-        if started:
-            await resp.awrite(",")
-        await resp.awrite(json.dumps({"line": line, "timestamp": timestamp, "id": i}))
-        started = True
+    async with BufferedWriter(resp) as w:
+        if _wants_binary(req):
+            await _graph_log_bin(w, readings, headers)
+            return
 
-    await resp.awrite("]")
+        await picoweb.start_response(
+            w, content_type="application/json", headers=headers
+        )
+        await w.awrite("[")
+        started = False
+        for reading in readings:
+            if started:
+                await w.awrite(",")
+            enc = {
+                "soil_temperature": reading.floats[0],
+                "soil_humidity": reading.floats[1],
+                "valve": reading.bools[0],
+                "watering": reading.bools[1],
+                "auto_mode": reading.bools[2],
+                "timestamp": reading.timestamp,
+                "id": reading.id,
+            }
+            await jsonstream.dump(enc, w)
+            started = True
+        await w.awrite("]")
+
+
+@route("/api/syslog/")
+@cors
+async def syslog(req, resp, headers=None):
+    """
+    Get syslog records, newest first.
 
+    Records can be filtered by level (at or above, by number or name), logger
+    and time (since/until, in seconds or as e.g. 2021-09-01T06:00), as well
+    as paginated like /api/log/.
+    """
+    req.parse_qs()
+    try:
+        records = log.read(
+            n=_query_int(req, "limit", _query_int(req, "n", 20)),
+            skip=_query_int(req, "skip", 0),
+            since_id=_query_int(req, "since_id"),
+            until_id=_query_int(req, "until_id"),
+            level=_query_level(req),
+            logger=req.form.get("logger"),
+            since=_query_time(req, "since"),
+            until=_query_time(req, "until"),
+        )
+    except ValueError as e:
+        await json_response(resp, {"error": str(e)}, headers, "400")
+        return
 
-@app.route("/api/repl/")
+    async with BufferedWriter(resp) as w:
+        await picoweb.start_response(
+            w, content_type="application/json", headers=headers
+        )
+        await w.awrite("[")
+        started = False
+        for i, t, level, name, msg in records:
+            if started:
+                await w.awrite(",")
+            record = {
+                "line": "{} - {}: {}".format(name, logging.getLevelName(level), msg),
+                "timestamp": localtime(t)[:6],
+                "id": i,
+            }
+            await jsonstream.dump(record, w)
+            started = True
+
+        await w.awrite("]")
+
+
+@route("/api/repl/")
 @cors
 async def fallback(req, resp, headers=None):
     """Fall back to repl."""
     with open("/.fallback", "w") as f:
         f.write("")
     _countdown()
-    encoded = json.dumps({"status": "Falling back in 10s"})
-    await picoweb.start_response(resp, content_type="application/json", headers=headers)
-    await resp.awrite(encoded)
+    await json_response(resp, {"status": "Falling back in 10s"}, headers)
 
 
 async def _fallback():
     print("Falling back in 10")
     await asyncio.sleep(10)
-    from machine import reset
+    from . import reset
 
     reset()
 
@@ -264,7 +493,7 @@ def _countdown():
     asyncio.get_event_loop().create_task(_fallback())
 
 
-@app.route("/api/runtime/")
+@route("/api/runtime/")
 @cors
 async def runtime(req, resp, headers=None):
     """Get runtime."""
@@ -272,25 +501,47 @@ async def runtime(req, resp, headers=None):
     await json_response(resp, data, headers)
 
 
-@app.route("/api/frequency/")
+@route("/api/frequency/")
 @cors
 async def freq(req, resp, headers=None):
     """Get frequency of flow sensor."""
     await json_response(resp, {"value": hal.flow_sensor.frequency}, headers)
 
 
-@app.route("/api/flowrate/")
+@route("/api/flowrate/")
 @cors
 async def flowrate(req, resp, headers=None):
     """Get flow rate of flow sensor."""
     await json_response(resp, {"value": hal.flow_sensor.rate}, headers)
 
 
-def _report_status():
-    report = hal.status()
-    report["runtime"] = clock.timestr(clock.runtime())
-    report.update(settings.settings)
-    return report
+@route("/api/boot-profile/")
+@cors
+async def boot_profile(req, resp, headers=None):
+    """Get timing and heap usage for each stage of the last few boots."""
+    await json_response(resp, {"boots": bootprof.history()}, headers)
+
+
+@route("/api/lag/")
+@cors
+async def lag(req, resp, headers=None):
+    """Get the event loop lag histogram and the longest stalls."""
+    await json_response(resp, lagmon.monitor.summary(), headers)
+
+
+@route("/api/tasks/")
+@cors
+async def task_stats(req, resp, headers=None):
+    """Get time spent in each task, if enabled with the profile_tasks setting."""
+    await json_response(resp, tasks.summary(), headers)
+
+
+@route("/api/metrics")
+async def export_metrics(req, resp):
+    """Export metrics in the Prometheus text format."""
+    async with BufferedWriter(resp) as w:
+        await picoweb.start_response(w, content_type="text/plain; version=0.0.4")
+        await metrics.write(w)
 
 
 async def run_app():
@@ -300,4 +551,9 @@ async def run_app():
 
 def init(loop):
     """Initialise this module."""
+    status.init()
+    hal.temp_sensor.observers.append(_publish_reading)
+    hal.valve.observers.append(_publish_valve)
+    irrigation.auto_waterer.observers.append(_publish_watering)
+    settings.subscribe(_publish_setting)
     loop.create_task(run_app())
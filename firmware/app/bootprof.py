@@ -0,0 +1,43 @@
+"""Record how long each stage of booting takes and how much heap it uses."""
+import gc
+from json import dump, load
+
+from . import ticks_ms, upython
+
+FN = "boot_profile.json"
+KEEP = 5
+
+stages = []
+
+
+def mark(stage):
+    """Record the time and heap usage at the end of stage."""
+    if upython:  # pragma: no cover
+        free, alloc = gc.mem_free(), gc.mem_alloc()
+    else:
+        free = alloc = None
+    stages.append([stage, ticks_ms(), free, alloc])
+
+
+def history(fn=FN):
+    """Get the saved profiles, oldest first."""
+    try:
+        with open(fn) as f:
+            return load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save(reason=None, fn=FN, keep=KEEP):
+    """
+    Save this boot's stages, keeping only the last few boots.
+
+    Args:
+        reason[str]: why the device booted.
+        fn[str]: file to save to.
+        keep[int]: number of boots to keep, including this one.
+    """
+    boots = history(fn)
+    boots.append({"reason": reason, "stages": stages})
+    with open(fn, "w") as f:
+        dump(boots[-keep:], f)
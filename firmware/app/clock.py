@@ -1,5 +1,5 @@
 import logging
-from time import localtime, mktime
+from time import localtime, mktime, ticks_ms, time
 from sys import print_exception
 
 import network
@@ -7,6 +7,9 @@ import ntptime
 import uasyncio as asyncio
 from machine import RTC
 
+from . import wifi
+from .schedule import Every, scheduler
+
 rtc = RTC()
 rtc.datetime()
 wlan = network.WLAN(network.STA_IF)
@@ -14,6 +17,7 @@ clock_syncing = True
 
 logger = logging.getLogger(__name__)
 boot_time = None
+synced = asyncio.Event()
 
 
 def runtime():
@@ -40,21 +44,32 @@ def timestr(t):
     return "{} days {:02}:{:02}:{:02}".format(d, h, m, s)
 
 
-async def sync_clock():
+def sync_clock(*_):
+    if not clock_syncing or not wifi.connected.is_set():
+        return
+    try:
+        ntptime.settime()
+        rtc.datetime()
+    except OSError as e:  # errors occasionally
+        print_exception(e)
+
+
+async def first_sync(max_backoff=300):
+    """Sync the clock once the network is up, then set `synced`."""
     global boot_time
-    while True:
-        while clock_syncing:
-            await asyncio.sleep(60)
-            try:
-                ntptime.settime()
-                rtc.datetime()
-                if not boot_time:
-                    boot_time = localtime()
-            except OSError as e:  # errors occasionally
-                print_exception(e)
-            await asyncio.sleep(300)
-        while not clock_syncing:
-            await asyncio.sleep(1)
+    backoff = 1
+    while not clock_synced():
+        await wifi.connected.wait()
+        try:
+            ntptime.settime()
+        except (OverflowError, OSError) as e:
+            logger.warning("Failed to sync clock, retrying in {}s".format(backoff))
+            print_exception(e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+    boot_time = localtime(time() - ticks_ms() // 1_000)
+    scheduler.set_clock()
+    synced.set()
 
 
 def clock_synced():
@@ -63,4 +78,5 @@ def clock_synced():
 
 
 def init(loop):
-    loop.create_task(sync_clock())
+    loop.create_task(first_sync())
+    scheduler.add(Every(300), sync_clock)
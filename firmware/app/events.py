@@ -0,0 +1,89 @@
+import logging
+
+from . import upython
+
+if upython:  # pragma: no cover
+    import uasyncio as asyncio  # pragma: no cover
+    import ujson as json  # pragma: no cover
+else:
+    import asyncio
+    import json
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(self, size):
+        self.queue = []
+        self.size = size
+        self.ready = asyncio.Event()
+        self.dropped = False
+
+
+class Broker:
+    """
+    Fan events out to a bounded number of subscribers.
+
+    Every subscriber has a short queue.  One which falls so far behind that
+    its queue fills is dropped, rather than being allowed to hold anything up.
+    """
+
+    def __init__(self, max_subscribers=4, queue_size=8, write_timeout=5, keepalive=30):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.write_timeout = write_timeout
+        self.keepalive = keepalive
+        self.subscribers = []
+
+    def subscribe(self):
+        """Get a new subscriber, or None if there are too many already."""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        s = Subscriber(self.queue_size)
+        self.subscribers.append(s)
+        return s
+
+    def unsubscribe(self, s):
+        try:
+            self.subscribers.remove(s)
+        except ValueError:
+            pass
+
+    def publish(self, kind, data):
+        """Queue an event for every subscriber, dropping any which are full."""
+        if not self.subscribers:
+            return
+        msg = "event: {}\ndata: {}\n\n".format(kind, json.dumps(data))
+        for s in self.subscribers[:]:
+            if len(s.queue) >= s.size:
+                logger.info("Dropping slow subscriber")
+                s.dropped = True
+                self.unsubscribe(s)
+            else:
+                s.queue.append(msg)
+            s.ready.set()
+
+    async def stream(self, s, write):
+        """
+        Send events to s using write(str) until it is dropped.
+
+        Raises:
+            asyncio.TimeoutError if a write takes longer than write_timeout.
+
+        """
+        try:
+            while not s.dropped:
+                try:
+                    await asyncio.wait_for(s.ready.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    # lets us notice clients which have gone away
+                    await asyncio.wait_for(write(": keepalive\n\n"), self.write_timeout)
+                    continue
+                s.ready.clear()
+                while s.queue and not s.dropped:
+                    await asyncio.wait_for(write(s.queue.pop(0)), self.write_timeout)
+        finally:
+            self.unsubscribe(s)
+
+
+broker = Broker()
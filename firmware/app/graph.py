@@ -1,3 +1,5 @@
+import struct
+
 from packing.packed import PackedRotatingLog
 from .settings import settings
 
@@ -11,3 +13,54 @@ packer = PackedRotatingLog(
     keep_logs=settings.get("keep_logs", 3),
     timestamp=True,
 )
+
+# mean and worst event loop lag (ms) and number of stalls, every 15 minutes
+lag_packer = PackedRotatingLog(
+    "lag",
+    "/app/static/",
+    log_lines=settings.get("lag_log_size", 672),
+    floats=2,
+    ints=1,
+    bools=0,
+    keep_logs=4,
+    timestamp=True,
+)
+
+# Binary layout served by /api/log/?format=bin.  The stream starts with MAGIC and
+# the record size (uint16), followed by fixed-size little-endian records:
+#   id                          uint32
+#   year                        uint16
+#   month, day, hour, min, sec  uint8 each
+#   soil_temperature            float32 (NaN if unknown)
+#   soil_humidity               float32 (NaN if unknown)
+#   flags                       uint8: bit 0 valve, bit 1 watering, bit 2 auto_mode
+RECORD = "<IH5B2fB"
+RECORD_SIZE = struct.calcsize(RECORD)
+MAGIC = b"IRG1"
+HEADER = MAGIC + struct.pack("<H", RECORD_SIZE)
+_NAN = float("nan")
+
+
+def pack_into(buf, offset, reading):
+    """Pack a reading into buf at offset using the RECORD layout."""
+    ts = reading.timestamp
+    temperature, humidity = reading.floats[:2]
+    flags = 0
+    for i, b in enumerate(reading.bools[:3]):
+        if b:
+            flags |= 1 << i
+    struct.pack_into(
+        RECORD,
+        buf,
+        offset,
+        reading.id,
+        ts[0],
+        ts[1],
+        ts[2],
+        ts[3],
+        ts[4],
+        ts[5],
+        _NAN if temperature is None else temperature,
+        _NAN if humidity is None else humidity,
+        flags,
+    )
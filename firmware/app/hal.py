@@ -4,11 +4,14 @@ import uasyncio as asyncio
 from machine import Pin, Timer
 from sht1x import SHT1x
 
-from . import graph
+from . import clock, graph, metrics, ticks_diff, ticks_ms
+from .lagmon import blocking
 from .settings import settings
 from .valve import RateAwareValve
 
 logger = logging.getLogger("Hal")
+read_ms = metrics.Gauge("sensor_read_ms", "Time taken by the last sensor reading.")
+actuation_ms = metrics.Gauge("valve_actuation_ms", "Time taken by the last valve change.")
 
 
 class TempSensor:
@@ -20,18 +23,21 @@ class TempSensor:
         self.humidity = None
         self.logf = logf
         self.period = period
+        self.observers = []  # called with the sensor after every reading
+        self._trigger = asyncio.Event()
+        self._power_down = settings.key("{}--power_down_sensor".format(name), True)
 
     @property
     def power_down(self):
-        return settings.get("{}--power_down_sensor".format(self.name), True)
+        return self._power_down.value
 
     async def read_sensor(self):
         self.power.on()
         if self.power_down:
             await asyncio.sleep_ms(200)
-        # these are pretty instantaneous
-        self.temperature = self.sensor.read_temperature()
-        self.humidity = self.sensor.read_humidity()
+        # each conversion takes up to 320ms, so yield whilst waiting
+        self.temperature = await self.sensor.aread_temperature()
+        self.humidity = await self.sensor.aread_humidity(self.temperature)
         if self.power_down:
             power.off()
 
@@ -39,24 +45,39 @@ class TempSensor:
         silent_count = 0  # don't keep stale readings indefinitely
         while True:
             try:
+                start = ticks_ms()
                 await self.read_sensor()
+                read_ms.set(ticks_diff(ticks_ms(), start))
                 silent_count = 0
                 if self.logf:
                     self.logf(self)
+                for f in self.observers:
+                    f(self)
             except Exception as e:
                 logger.exc(e, "Read sensor failed: {}")
                 silent_count += 1
                 if silent_count > 10:
                     self.soil_temperature = None
                     self.soil_humidity = None
-            await asyncio.sleep(self.period)
+            try:
+                await asyncio.wait_for(self._trigger.wait(), self.period)
+            except asyncio.TimeoutError:
+                pass
+            self._trigger.clear()
+
+    def trigger(self):
+        """Take a reading now rather than waiting for the period to elapse."""
+        self._trigger.set()
 
     def init(self, loop):
         loop.create_task(self.read_sensor_loop())
 
 
 def log_temps(sensor):
-    graph.packer.append(floats=(sensor.temperature, sensor.humidity), bools=bools())
+    if not clock.synced.is_set():
+        return  # the timestamps would be meaningless
+    with blocking("graph log"):
+        graph.packer.append(floats=(sensor.temperature, sensor.humidity), bools=bools())
 
 
 def bools():
@@ -138,6 +159,20 @@ in1 = Pin(22, Pin.OUT)
 in2 = Pin(21, Pin.OUT)
 
 valve = RateAwareValve("valve1", en, in1, in2, rate_callback=lambda: flow_sensor.rate)
+metrics.Gauge("flow_rate", "Current flow rate.", lambda: flow_sensor.rate)
+_actuation_start = None
+
+
+def _time_actuation(valve):
+    global _actuation_start
+    if valve.current_state in (valve.OPENING, valve.CLOSING):
+        _actuation_start = ticks_ms()
+    elif _actuation_start is not None:
+        actuation_ms.set(ticks_diff(ticks_ms(), _actuation_start))
+        _actuation_start = None
+
+
+valve.observers.append(_time_actuation)
 
 
 def init(loop):
@@ -1,128 +1,229 @@
 import logging
 from sys import print_exception
-from time import localtime
 
 import uasyncio as asyncio
 
-from . import hal
+from . import hal, ticks_diff, ticks_ms
+from .schedule import hours_schedules, parse_schedules, scheduler
 from .settings import settings
 
 
 class AutoWaterer:
+    """
+    Water when the soil is dry.
+
+    Decisions are made whenever something they depend on changes: a new
+    sensor reading, watering being requested, a setting changing, or the
+    watering deadline passing.
+    """
+
     def __init__(self, name, sensor, valve, loop_delay=60):
         self.name = name
-        self.loop_delay = loop_delay
+        self.loop_delay = loop_delay  # longest we go without re-checking
         self._watering = False
         self.sensor = sensor
         self.valve = valve
         self.logger = logging.getLogger(self.name)
-        # populate settings on init in case needed elsewhere
-        # e.g. for api/web status page
-        self.lower_humidity
-        self.upper_humidity
-        self.watering_hours
-        self.watering_minutes
-        self.elapsed = 0
+        # resolve settings on init: this also populates them in case needed
+        # elsewhere, e.g. for api/web status page
+        self._auto_mode = self._key("auto_mode", True)
+        self._lower_temperature = self._key("lower_temperature", 5)
+        self._lower_humidity = self._key("lower_humidity_threshold", 65)
+        self._upper_humidity = self._key("upper_humidity_threshold", 75)
+        self._watering_hours = self._key("watering_hours", [6, 12])
+        self._watering_minutes = self._key("watering_minutes", 30)
+        # e.g. "6:01/30/0-4;12:01": hour:minute, then optionally the duration
+        # in minutes and weekdays (0 is Monday), see schedule.parse_daily
+        self._schedules = self._key("schedules", self._default_schedules())
+        self._jobs = []
+        self._duration = None  # minutes, overriding watering_minutes
+        self._started = None  # ticks_ms when the valve was opened
         self._sensor_period = None
+        self._wake = asyncio.Event()
+        self.observers = []  # called with the waterer when watering starts or stops
+        sensor.observers.append(self._poke)
+        for key in (
+            self._auto_mode,
+            self._lower_temperature,
+            self._lower_humidity,
+            self._upper_humidity,
+            self._watering_minutes,
+        ):
+            key.subscribe(self._poke)
+        self._schedules.subscribe(self._schedule)
+        self._schedule()
+
+    def _key(self, k, fallback):
+        return settings.key("{}--{}".format(self.name, k), fallback)
+
+    def _poke(self, *_):
+        self._wake.set()
 
     @property
     def auto_mode(self):
-        return settings.get("{}--auto_mode".format(self.name), True)
+        return self._auto_mode.value
 
     @auto_mode.setter
     def auto_mode(self, val):
-        return settings.set("{}--auto_mode".format(self.name), val)
+        self._auto_mode.set(val)
 
-    def watering(self, val=None):
-        if val:
+    def watering(self, val=None, duration=None):
+        if val and not self._watering:
+            self._duration = duration
             self._watering = True
             self._sensor_period = self.sensor.period
             self.sensor.period = 10
-        elif val is False:
+            self.sensor.trigger()
+            self._changed()
+        elif val is False and self._watering:
             self.sensor.period = self._sensor_period
             self._watering = False
+            self._changed()
         return self._watering
 
+    def _changed(self):
+        self._poke()
+        for f in self.observers:
+            f(self)
+
     @property
     def lower_temperature(self):
-        return settings.get("{}--lower_temperature".format(self.name), 5)
+        return self._lower_temperature.value
 
     @property
     def lower_humidity(self):
-        return settings.get("{}--lower_humidity_threshold".format(self.name), 65)
+        return self._lower_humidity.value
 
     @property
     def upper_humidity(self):
-        return settings.get("{}--upper_humidity_threshold".format(self.name), 75)
+        return self._upper_humidity.value
 
     @property
     def watering_hours(self):
-        return settings.get("{}--watering_hours".format(self.name), [6, 12])
+        return self._watering_hours.value
 
     @property
     def watering_minutes(self):
-        return settings.get("{}--watering_minutes".format(self.name), 30)
+        return self._watering_minutes.value
 
-    async def schedule_loop(self):
-        while True:
-            h, m = localtime()[3:5]
-            if h in self.watering_hours and m == 1:
-                self.logger.info("Scheduling watering")
-                self.watering(True)
-            await asyncio.sleep(60)
+    @property
+    def schedules(self):
+        return self._schedules.value
+
+    @property
+    def duration(self):
+        """Minutes to water for this time."""
+        return self._duration or self.watering_minutes
+
+    @property
+    def elapsed(self):
+        """Minutes since the valve was opened."""
+        if self._started is None:
+            return 0
+        return ticks_diff(ticks_ms(), self._started) / 60_000
+
+    def _default_schedules(self):
+        try:
+            return hours_schedules(self.watering_hours)
+        except Exception as e:
+            self.logger.error(
+                "Invalid watering hours {!r}: {}".format(self.watering_hours, e)
+            )
+            return ""
+
+    def _schedule(self, *_):
+        """Replace the scheduled jobs, keeping the old ones if schedules is invalid."""
+        try:
+            whens = parse_schedules(self.schedules)
+        except Exception as e:
+            self.logger.error("Invalid schedules {!r}: {}".format(self.schedules, e))
+            if self._jobs:
+                return
+            try:
+                whens = parse_schedules(self._default_schedules())
+            except Exception as e:
+                self.logger.error("Invalid default schedules, none set: {}".format(e))
+                whens = []
+        jobs = [scheduler.add(when, self._scheduled, self.name) for when in whens]
+        for job in self._jobs:
+            scheduler.remove(job)
+        self._jobs = jobs
+
+    def _scheduled(self, job):
+        self.logger.info("Scheduling watering")
+        self.watering(True, job.when.duration)
 
     def start_watering_condition(self):
         return (
             self.watering()
+            and self.sensor.humidity is not None
             and self.sensor.humidity < self.lower_humidity
             and self.sensor.temperature > self.lower_temperature
         )
 
     def stop_watering_condition(self):
         return self.watering() and (
-            self.sensor.humidity > self.upper_humidity
-            or self.elapsed > self.watering_minutes
+            self.elapsed >= self.duration
+            or (
+                self.sensor.humidity is not None
+                and self.sensor.humidity > self.upper_humidity
+            )
         )
 
+    def _timeout(self):
+        """Seconds until the next check is due regardless of events."""
+        if self._started is None:
+            return self.loop_delay
+        remaining = (self.duration - self.elapsed) * 60
+        return max(0, min(remaining, self.loop_delay))
+
+    async def _step(self):
+        if self.valve.current_state == self.valve.CLOSED:
+            if self._started is not None:
+                # closed by something else, e.g. the api: this run is over
+                self.logger.info("Valve closed after {:.1f} mins".format(self.elapsed))
+                self._started = None
+                self.watering(False)
+            elif self.start_watering_condition():
+                self.logger.info(
+                    "Started watering humidity {} < {}".format(
+                        self.sensor.humidity, self.lower_humidity
+                    )
+                )
+                # start timing first: if opening throws the valve may still be
+                # open, and the deadline must still close it
+                self._started = ticks_ms()
+                await self.valve.state(True)  # can throw
+
+        elif self.stop_watering_condition():
+            self.logger.info("Stopped watering after {:.1f} mins".format(self.elapsed))
+            await self.valve.state(False)  # can throw
+            self.watering(False)
+            self._started = None
+
     async def auto_water_loop(self):
         while True:
-            self.elapsed = 0
             while self.auto_mode:
+                # clear first, so that anything happening during the step
+                # causes another one straight away
+                self._wake.clear()
                 try:
-                    if self.valve.current_state == self.valve.CLOSED:
-                        if self.start_watering_condition():
-                            self.logger.info(
-                                "Started watering humidity {} < {}".format(
-                                    self.sensor.humidity, self.lower_humidity
-                                )
-                            )
-                            await self.valve.state(True)  # can throw
-                            self.elapsed += 0.5 / 60
-
-                        await asyncio.sleep_ms(500)
-                        continue
-
-                    else:
-                        if self.stop_watering_condition():
-                            self.logger.info("Stopped watering")
-                            await self.valve.state(False)  # can throw
-                            self.watering(False)
-                            self.elapsed = 0
-                        self.elapsed += self.loop_delay / 60
-
+                    await self._step()
                 except Exception as e:
                     self.logger.exc(e, "Error in watering loop")
 
-                await asyncio.sleep(self.loop_delay)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._timeout())
+                except asyncio.TimeoutError:
+                    pass
 
             self.logger.info("Stopped watering loop.")
 
             while not self.auto_mode:
-                await asyncio.sleep_ms(100)
+                await self._auto_mode.wait()
 
     def init(self, loop):
         loop.create_task(self.auto_water_loop())
-        loop.create_task(self.schedule_loop())
 
 
 auto_waterer = AutoWaterer("waterer1", hal.temp_sensor, hal.valve)
@@ -0,0 +1,42 @@
+from . import upython
+
+if upython:  # pragma: no cover
+    import ujson as json  # pragma: no cover
+else:
+    import json
+
+
+async def dump(obj, w):
+    """
+    Write obj to w as JSON without building the whole string.
+
+    Containers are walked and only scalars are encoded, so memory use is
+    bounded by the largest scalar rather than the size of obj.
+
+    Args:
+        obj: dict, list, tuple or anything json.dumps accepts.
+        w: anything with an awrite method, e.g. a BufferedWriter.
+
+    """
+    if isinstance(obj, dict):
+        await w.awrite("{")
+        first = True
+        for k, v in obj.items():
+            if not first:
+                await w.awrite(", ")
+            first = False
+            await w.awrite(json.dumps(k if isinstance(k, str) else str(k)))
+            await w.awrite(": ")
+            await dump(v, w)
+        await w.awrite("}")
+    elif isinstance(obj, (list, tuple)):
+        await w.awrite("[")
+        first = True
+        for v in obj:
+            if not first:
+                await w.awrite(", ")
+            first = False
+            await dump(v, w)
+        await w.awrite("]")
+    else:
+        await w.awrite(json.dumps(obj))
@@ -0,0 +1,129 @@
+"""Measure how late the event loop wakes tasks, and what was blocking it."""
+from time import time
+
+from . import ticks_diff, ticks_ms, upython
+
+if upython:  # pragma: no cover
+    import uasyncio as asyncio  # pragma: no cover
+else:
+    import asyncio
+
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000)  # upper bounds in ms
+
+
+class LagMonitor:
+    """
+    Sleep for a fixed period and record how late each wake-up is.
+
+    Lags are counted in a fixed histogram (the last count is for lags over the
+    largest bucket) and the `top` longest stalls are kept, labelled with the
+    longest `blocking()` section which ran since the previous wake-up.
+    """
+
+    def __init__(self, period_ms=100, buckets=BUCKETS, top=5, stall_ms=50):
+        self.period_ms = period_ms
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.top = top
+        self.stall_ms = stall_ms
+        self.stalls = []  # [lag, label, time], longest first
+        self.max = 0
+        self._culprit = None
+        self._culprit_ms = 0
+        self._reset_interval()
+
+    def _reset_interval(self):
+        self._sum = 0
+        self._n = 0
+        self._max = 0
+        self._stalls = 0
+
+    def note(self, label, ms):
+        """Note that label blocked the loop for ms."""
+        if ms >= self._culprit_ms:
+            self._culprit = label
+            self._culprit_ms = ms
+
+    def record(self, lag):
+        """Record a wake-up which was lag ms late."""
+        i = 0
+        for bound in self.buckets:
+            if lag <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.max = max(self.max, lag)
+        self._sum += lag
+        self._n += 1
+        self._max = max(self._max, lag)
+
+        if lag >= self.stall_ms:
+            self._stalls += 1
+            if len(self.stalls) < self.top or lag > self.stalls[-1][0]:
+                self.stalls.append([lag, self._culprit, int(time())])
+                self.stalls.sort(key=lambda s: -s[0])
+                del self.stalls[self.top :]
+        self._culprit = None
+        self._culprit_ms = 0
+
+    def interval(self):
+        """Return (mean, max, stalls) since the last call and start a new interval."""
+        mean = self._sum / self._n if self._n else 0
+        result = (mean, self._max, self._stalls)
+        self._reset_interval()
+        return result
+
+    def summary(self):
+        return {
+            "period_ms": self.period_ms,
+            "buckets": self.buckets,
+            "counts": self.counts,
+            "max": self.max,
+            "stalls": [
+                {"lag": lag, "label": label, "time": t} for lag, label, t in self.stalls
+            ],
+        }
+
+    async def run(self):
+        while True:
+            start = ticks_ms()
+            await asyncio.sleep(self.period_ms / 1_000)
+            self.record(max(ticks_diff(ticks_ms(), start) - self.period_ms, 0))
+
+
+monitor = LagMonitor()
+
+
+class blocking:
+    """
+    Label a section of code which blocks the loop.
+
+    Use as `with blocking("name"):` around synchronous work such as flash
+    writes so that stalls can be attributed to it.
+    """
+
+    def __init__(self, label, monitor=monitor):
+        self.label = label
+        self.monitor = monitor
+
+    def __enter__(self):
+        self.start = ticks_ms()
+        return self
+
+    def __exit__(self, *_):
+        self.monitor.note(self.label, ticks_diff(ticks_ms(), self.start))
+
+
+def log_lag(*_):
+    """Append the lag over the last interval to the packed lag log."""
+    from . import graph
+
+    mean, worst, stalls = monitor.interval()
+    graph.lag_packer.append(floats=(mean, worst), ints=(stalls,))
+
+
+def init(loop):
+    from .schedule import Every, scheduler
+
+    loop.create_task(monitor.run())
+    scheduler.add(Every(900), log_lag)
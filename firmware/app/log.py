@@ -1,28 +1,244 @@
 import logging
-from packing.text import RotatingLog
+import struct
+from json import dump, load
+
+from ringfile import RingFile
+
+from . import metrics, upython
+from .lagmon import blocking
 from .settings import settings
 
-rotating_log = RotatingLog(
-    "log",
-    "/app/static/",
-    log_lines=settings.get("syslog_lines", 200),
-    keep_logs=2,
-    timestamp=True,
+if upython:  # pragma: no cover
+    import uasyncio as asyncio  # pragma: no cover
+else:
+    import asyncio
+
+# Each syslog record is RECORD followed by the utf-8 message, so records can be
+# filtered on their header without reading the message.
+RECORD = "<IBB"  # timestamp, level, logger id
+RECORD_SIZE = struct.calcsize(RECORD)
+
+ring = RingFile(
+    "syslog.bin",
+    slots=settings.get("syslog_lines", 256),
+    slot_size=settings.get("syslog_slot_size", 256),
 )
 
 
-class RotatingLogHandler(logging.Handler):
-    def __init__(self, log):
+class LoggerNames:
+    """
+    Ids for logger names, saved so they stay the same across boots.
+
+    New names are only saved by `save()`, so that logging never waits on flash.
+    """
+
+    MAX = 255  # ids are a byte; later names share the last id
+
+    def __init__(self, fn):
+        self.fn = fn
+        try:
+            with open(fn) as f:
+                self.names = load(f)
+        except (OSError, ValueError):
+            self.names = []
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.dirty = False
+
+    def id(self, name):
+        try:
+            return self.ids[name]
+        except KeyError:
+            pass
+        if len(self.names) >= self.MAX:
+            return self.MAX
+        self.ids[name] = len(self.names)
+        self.names.append(name)
+        self.dirty = True
+        return self.ids[name]
+
+    def save(self):
+        if not self.dirty:
+            return
+        with open(self.fn, "w") as f:
+            dump(self.names, f)
+        self.dirty = False
+
+    def name(self, i):
+        return self.names[i] if i < len(self.names) else "?"
+
+
+names = LoggerNames("syslog_names.json")
+
+
+class PackedFormatter(logging.Formatter):
+    """Format records as RECORD followed by the message, to fit in size bytes."""
+
+    def __init__(self, names, size):
+        super().__init__("%(message)s")
+        self.names = names
+        self.size = size
+
+    def format(self, record):
+        msg = super().format(record).encode()
+        size = self.size - RECORD_SIZE
+        if len(msg) > size:
+            # don't split a multi-byte character
+            while size and msg[size] & 0xC0 == 0x80:
+                size -= 1
+            msg = msg[:size]
+        header = struct.pack(
+            RECORD, int(record.created), record.levelno, self.names.id(record.name)
+        )
+        return header + msg
+
+
+class QueueHandler(logging.Handler):
+    """
+    Queue formatted records in RAM and write them out in batches.
+
+    Records are written by a task once `batch` are waiting or the oldest has
+    waited `max_age_ms`, so logging never blocks on flash.  When the ring is
+    full new records are dropped and counted.  Call `flush()` to write
+    everything out synchronously, e.g. before resetting.
+    """
+
+    def __init__(self, write, size=64, batch=16, max_age_ms=5_000):
+        """
+        Args:
+            write[callable]: called with each formatted line.
+            size[int]: most records to hold.
+            batch[int]: number of records which triggers a write.
+            max_age_ms[int]: longest a record waits before being written.
+        """
         super().__init__()
-        self.log = log
+        self.write = write
+        self.ring = [None] * size
+        self.head = 0  # next slot to fill
+        self.n = 0
+        self.batch = batch
+        self.max_age_ms = max_age_ms
+        self.dropped = 0
+        self._unreported = 0
+        self._ready = asyncio.Event()
 
     def emit(self, record):
-        if record.levelno >= self.level:
-            self.log.append(self.formatter.format(record))
+        if record.levelno < self.level:
+            return
+        if self.n == len(self.ring):
+            self.dropped += 1
+            self._unreported += 1
+            return
+        self.ring[self.head] = self.formatter.format(record)
+        self.head = (self.head + 1) % len(self.ring)
+        self.n += 1
+        if self.n == 1 or self.n >= self.batch:
+            self._ready.set()
+
+    def flush(self):
+        """Write out everything queued."""
+        if not self.n and not self._unreported:
+            return
+        size = len(self.ring)
+        with blocking("syslog"):
+            while self.n:
+                i = (self.head - self.n) % size
+                self.write(self.ring[i])
+                self.ring[i] = None
+                self.n -= 1
+            if self._unreported:
+                record = logging.LogRecord(
+                    "log",
+                    logging.WARNING,
+                    None,
+                    None,
+                    "Dropped %s log records",
+                    (self._unreported,),
+                    None,
+                )
+                self.write(self.formatter.format(record))
+                self._unreported = 0
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            if self.n < self.batch:
+                try:
+                    await asyncio.wait_for(self._wait_full(), self.max_age_ms / 1_000)
+                except asyncio.TimeoutError:
+                    pass
+            self._ready.clear()
+            self.flush()
+
+    async def _wait_full(self):
+        while self.n < self.batch:
+            self._ready.clear()
+            await self._ready.wait()
+
 
+def _write(record):
+    names.save()  # before any record using a new id
+    ring.append(record)
 
-rotating_handler = RotatingLogHandler(rotating_log)
-rotating_handler.setLevel(logging.INFO)
-rotating_handler.setFormatter(
-    logging.Formatter("%(name)s - %(levelname)s: %(message)s")
+
+queue_handler = QueueHandler(_write)
+queue_handler.setLevel(logging.INFO)
+queue_handler.setFormatter(
+    PackedFormatter(names, ring.slot_size - struct.calcsize(RingFile.SLOT_HEADER))
 )
+metrics.Gauge("log_dropped", "Log records dropped.", lambda: queue_handler.dropped)
+
+
+def init(loop):
+    loop.create_task(queue_handler.run())
+
+
+def read(
+    n=20,
+    skip=0,
+    since_id=None,
+    until_id=None,
+    level=logging.NOTSET,
+    logger=None,
+    since=None,
+    until=None,
+):
+    """
+    Yield (id, timestamp, level, logger, message) for matching records, newest first.
+
+    Only the record header is read unless a record matches.
+
+    Args:
+        n[int]: most records to yield.
+        skip[int]: newest records to skip before filtering.
+        since_id[int]: only records after this id.
+        until_id[int]: only records up to and including this id.
+        level[int]: only records at or above this level.
+        logger[str]: only records from this logger.
+        since[int]: only records at or after this time.
+        until[int]: only records at or before this time.
+    """
+    logger_id = None
+    if logger is not None:
+        logger_id = names.ids.get(logger)
+        if logger_id is None:
+            return
+    end = ring.seq - skip
+    if until_id is not None:
+        end = min(end, until_id + 1)
+    start = ring.first if since_id is None else max(ring.first, since_id + 1)
+    for seq in range(end - 1, start - 1, -1):
+        if n <= 0:
+            return
+        header = ring.read(seq, RECORD_SIZE)
+        if header is None or len(header) < RECORD_SIZE:
+            continue
+        t, lvl, i = struct.unpack(RECORD, header)
+        if (
+            lvl < level
+            or (logger_id is not None and i != logger_id)
+            or (since is not None and t < since)
+            or (until is not None and t > until)
+        ):
+            continue
+        yield seq, t, lvl, names.name(i), ring.read(seq)[RECORD_SIZE:].decode()
+        n -= 1
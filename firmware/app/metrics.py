@@ -0,0 +1,142 @@
+"""Counters, gauges and histograms exported in the Prometheus text format."""
+from . import ticks_diff, ticks_ms, upython
+
+registry = []
+
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000)  # ms
+
+
+def labels(**kwargs):
+    """Format labels, e.g. labels(route="/") -> 'route="/"'."""
+    return ",".join('{}="{}"'.format(k, v) for k, v in sorted(kwargs.items()))
+
+
+def _name(name, label, extra=""):
+    label = ",".join(x for x in (label, extra) if x)
+    return "{}{{{}}}".format(name, label) if label else name
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, registry=registry):
+        self.name = name
+        self.help = help
+        self.values = {}  # label string: value
+        registry.append(self)
+
+    def samples(self):
+        """Yield (name, value) for every sample."""
+        for label, v in self.values.items():
+            yield _name(self.name, label), v
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, label="", n=1):
+        self.values[label] = self.values.get(label, 0) + n
+
+
+class Gauge(Metric):
+    """A value which can go up and down, either set directly or read from f()."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, f=None, registry=registry):
+        super().__init__(name, help, registry)
+        self.f = f
+
+    def set(self, v, label=""):
+        self.values[label] = v
+
+    def samples(self):
+        if self.f:
+            yield self.name, self.f()
+        else:
+            yield from super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, registry=registry):
+        super().__init__(name, help, registry)
+        self.buckets = buckets
+
+    def observe(self, v, label=""):
+        try:
+            counts = self.values[label]
+        except KeyError:
+            # a count per bucket, +Inf, then the sum
+            counts = self.values[label] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if v <= bound:
+                counts[i] += 1
+        counts[-2] += 1
+        counts[-1] += v
+
+    def samples(self):
+        for label, counts in self.values.items():
+            for bound, n in zip(self.buckets, counts):
+                yield _name(self.name + "_bucket", label, 'le="{}"'.format(bound)), n
+            yield _name(self.name + "_bucket", label, 'le="+Inf"'), counts[-2]
+            yield _name(self.name + "_sum", label), counts[-1]
+            yield _name(self.name + "_count", label), counts[-2]
+
+
+async def write(w, registry=registry):
+    """Write every metric in registry to w in the Prometheus text format."""
+    for metric in registry:
+        await w.awrite("# HELP {} {}\n".format(metric.name, metric.help))
+        await w.awrite("# TYPE {} {}\n".format(metric.name, metric.kind))
+        for name, v in metric.samples():
+            if v is not None:
+                await w.awrite("{} {}\n".format(name, v))
+
+
+requests = Counter("http_requests_total", "Requests handled, by route.")
+errors = Counter("http_errors_total", "Requests which raised an exception, by route.")
+sent = Counter("http_response_bytes_total", "Bytes sent, by route.")
+latency = Histogram("http_request_duration_ms", "Time to handle a request, by route.")
+
+if upython:  # pragma: no cover
+    import gc
+
+    Gauge("heap_free_bytes", "Free heap.", gc.mem_free)
+    Gauge("heap_alloc_bytes", "Allocated heap.", gc.mem_alloc)
+
+
+class CountingResponse:
+    """Wrap a response, counting the bytes written to it."""
+
+    def __init__(self, resp):
+        self.resp = resp
+        self.written = 0
+
+    def awrite(self, data, off=0, sz=-1):
+        self.written += len(data) - off if sz < 0 else sz
+        return self.resp.awrite(data, off, sz)
+
+    def __getattr__(self, name):
+        return getattr(self.resp, name)
+
+
+def timed(route, f):
+    """Wrap the handler f to record requests, errors, latency and size under route."""
+    label = labels(route=route)
+
+    def _timed(req, resp):
+        start = ticks_ms()
+        resp = CountingResponse(resp)
+        try:
+            yield from f(req, resp)
+        except Exception:
+            errors.inc(label)
+            raise
+        finally:
+            requests.inc(label)
+            latency.observe(ticks_diff(ticks_ms(), start), label)
+            sent.inc(label, resp.written)
+
+    return _timed
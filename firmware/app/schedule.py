@@ -0,0 +1,214 @@
+import logging
+from time import localtime, time
+
+from . import upython
+
+if upython:  # pragma: no cover
+    import uasyncio as asyncio  # pragma: no cover
+else:
+    import asyncio
+
+logger = logging.getLogger(__name__)
+
+
+class Daily:
+    """Due at hour:minute on the given weekdays (0 is Monday), or every day."""
+
+    needs_clock = True  # meaningless until the clock has been set
+
+    def __init__(self, hour, minute=0, duration=None, weekdays=None):
+        self.hour = hour
+        self.minute = minute
+        self.duration = duration
+        self.weekdays = weekdays
+
+    def next_after(self, t):
+        """Get the first due time strictly after t, or None if never due."""
+        lt = localtime(t)
+        midnight = t - lt[3] * 3600 - lt[4] * 60 - lt[5]
+        for day in range(8):
+            due = midnight + day * 86400 + self.hour * 3600 + self.minute * 60
+            if due > t and (self.weekdays is None or (lt[6] + day) % 7 in self.weekdays):
+                return due
+        return None
+
+
+def _weekdays(s):
+    """Parse weekdays such as "0-4" or "06" (0 is Monday)."""
+    if "-" in s:
+        first, last = s.split("-")
+        days = list(range(int(first), int(last) + 1))
+    else:
+        days = [int(d) for d in s]
+    if not all(0 <= d < 7 for d in days):
+        raise ValueError("Weekdays must be 0-6: {}".format(s))
+    return days
+
+
+def parse_daily(s):
+    """
+    Parse "hour:minute[/duration[/weekdays]]", e.g. "6:01/30/0-4", into a Daily.
+
+    Raises ValueError if s isn't valid.
+    """
+    fields = s.split("/")
+    if len(fields) > 3:
+        raise ValueError("Too many fields: {}".format(s))
+    hour, _, minute = fields[0].partition(":")
+    hour = int(hour)
+    minute = int(minute) if minute else 0
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError("Invalid time: {}".format(fields[0]))
+    duration = int(fields[1]) if len(fields) > 1 and fields[1] else None
+    weekdays = _weekdays(fields[2]) if len(fields) > 2 else None
+    return Daily(hour, minute, duration, weekdays)
+
+
+def parse_schedules(v):
+    """
+    Parse schedules separated by ";", e.g. "6:01/30/0-4;12:01", into Dailys.
+
+    A plain number is an hour, as the settings API stores "6" as 6.
+    Raises ValueError if v isn't valid.
+    """
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        v = "{}".format(int(v))
+    if not isinstance(v, str):
+        raise ValueError("Schedules must be a string: {!r}".format(v))
+    return [parse_daily(x.strip()) for x in v.split(";") if x.strip()]
+
+
+def hours_schedules(hours, minute=1):
+    """
+    Format schedules at minute past each of hours, e.g. [6, 12] -> "6:01;12:01".
+
+    Hours may be floats, as the settings API stores numbers as floats.
+    """
+    return ";".join("{}:{:02d}".format(int(h), minute) for h in hours)
+
+
+class Every:
+    """Due every `seconds`."""
+
+    needs_clock = False
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def next_after(self, t):
+        """Get the first due time strictly after t."""
+        return t + self.seconds
+
+
+class Job:
+    def __init__(self, when, f, name, grace):
+        self.when = when
+        self.f = f
+        self.name = name
+        self.grace = grace
+        self.due = None
+
+
+class Scheduler:
+    """
+    Run callbacks when they fall due.
+
+    The scheduler sleeps until the next job is due rather than waking
+    periodically.  A job which was missed (e.g. because the loop was blocked)
+    is run once when the scheduler next wakes, provided it is no more than
+    `grace` seconds late; larger jumps (such as the first clock sync) are
+    skipped.
+    """
+
+    MAX_SLEEP = 3600  # re-check at least this often in case the clock is set
+
+    def __init__(self, clock_set=True):
+        """
+        Args:
+            clock_set[bool]: whether the clock is already right.  If not, jobs
+                which need it (e.g. Daily) are held until `set_clock()`.
+        """
+        self.jobs = []
+        self.clock_set = clock_set
+        self._changed = asyncio.Event()
+
+    def add(self, when, f, name=None, grace=3600):
+        """
+        Schedule f(job) to be called whenever `when` is due.
+
+        Args:
+            when: object with a `next_after(t)` method, e.g. Daily or Every.
+            f[callable]: called with the job.  Should not block: start a task
+                if it needs to await anything.
+            name[str]: name for logging.
+            grace[int]: longest in seconds a job can be late and still run.
+
+        Returns: the job, which can be passed to `remove()`.
+
+        """
+        job = Job(when, f, name or f.__name__, grace)
+        self.jobs.append(job)
+        self._changed.set()
+        return job
+
+    def remove(self, job):
+        try:
+            self.jobs.remove(job)
+        except ValueError:
+            pass
+
+    def reset(self):
+        """Recompute every due time, e.g. after the clock has been set."""
+        for job in self.jobs:
+            job.due = None
+        self._changed.set()
+
+    def set_clock(self):
+        """Note that the clock is now right, releasing any held jobs."""
+        self.clock_set = True
+        self.reset()
+
+    def run_pending(self, now):
+        """Run any jobs due at or before now and work out when they are next due."""
+        for job in self.jobs[:]:
+            if job.when.needs_clock and not self.clock_set:
+                continue
+            nxt = job.when.next_after(now)
+            if job.due is None or (nxt is not None and nxt < job.due):
+                # new job, or the clock has gone backwards
+                job.due = nxt
+                continue
+            if job.due > now:
+                continue
+            late = now - job.due
+            job.due = nxt
+            if late > job.grace:
+                logger.warning("Skipped {}: {}s late".format(job.name, late))
+                continue
+            try:
+                job.f(job)
+            except Exception as e:
+                logger.exc(e, "Error running {}".format(job.name))
+
+    def next_due(self):
+        dues = [job.due for job in self.jobs if job.due is not None]
+        return min(dues) if dues else None
+
+    async def run(self):
+        while True:
+            self._changed.clear()
+            now = time()
+            self.run_pending(now)
+            due = self.next_due()
+            delay = self.MAX_SLEEP if due is None else min(due - now, self.MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._changed.wait(), max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+
+scheduler = Scheduler(clock_set=False)  # set by clock.first_sync
+
+
+def init(loop):
+    loop.create_task(scheduler.run())
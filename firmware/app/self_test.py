@@ -2,15 +2,16 @@ import gc
 from sys import print_exception
 import uasyncio as asyncio
 from .clock import clockstr
-import machine
+from .lagmon import blocking
 
 errors = []
 
 
 def log_print(*args):
     print(*args)
-    with open("/app/static/test.log", "a") as f:
-        f.write("{}\n".format(" ".join(args)))
+    with blocking("self-test log"):
+        with open("/app/static/test.log", "a") as f:
+            f.write("{}\n".format(" ".join(args)))
 
 
 async def run_test(testfn, name):
@@ -111,4 +112,6 @@ async def run_tests():
 async def reboot_later():
     await asyncio.sleep(60)
     print("Rebooting....")
-    machine.reset()
+    from . import reset
+
+    reset()
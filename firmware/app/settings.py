@@ -1,33 +1,139 @@
-from json import load, dump
+import os
+from json import dump, load
+
+from . import upython
+from .lagmon import blocking
+
+if upython:  # pragma: no cover
+    import uasyncio as asyncio  # pragma: no cover
+else:
+    import asyncio
+
+
+class Key:
+    """A handle on a single setting, resolved once and kept up to date."""
+
+    def __init__(self, store, k, fallback=None):
+        self.store = store
+        self.k = k
+        self.value = store.get(k, fallback)
+        self.changed = asyncio.Event()
+        self._observers = []
+
+    def set(self, v):
+        self.store.set(self.k, v)
+
+    def subscribe(self, f):
+        """Call f(value) whenever this setting changes."""
+        self._observers.append(f)
+
+    async def wait(self):
+        """Wait for the next change and return the new value."""
+        await self.changed.wait()
+        self.changed.clear()
+        return self.value
+
+    def _notify(self, v):
+        self.value = v
+        self.changed.set()
+        for f in self._observers:
+            f(v)
 
 
 class Settings:
-    def __init__(self, fn):
+    def __init__(self, fn, delay_ms=None):
+        """
+        Initialise the settings store.
+
+        Args:
+            fn[str]: File to persist settings in.
+            delay_ms[int]: Coalesce writes made within this window.  If None,
+                every change is written immediately.
+
+        """
         self.fn = fn
+        self.delay_ms = delay_ms
         self.settings = {}
+        self.dirty = False
+        self._changed = asyncio.Event()
+        self._keys = {}
+        self._observers = []
         try:
             self.load_settings()
         except Exception:
             self.set("created", True)
 
     def load_settings(self):
-        with open(self.fn, "r") as f:
+        try:
+            f = open(self.fn, "r")
+        except OSError:
+            # power was lost between removing the old file and renaming the new one
+            f = open(self.fn + ".tmp", "r")
+        with f:
             self.settings = load(f)
 
     def set(self, k, v):
         self.settings[k] = v
-        with open(self.fn, "w") as f:
-            dump(self.settings, f)
+        self.dirty = True
+        if self.delay_ms is None:
+            self.flush()
+        else:
+            self._changed.set()
+        key = self._keys.get(k)
+        if key:
+            key._notify(v)
+        for f in self._observers:
+            f(k, v)
+
+    def subscribe(self, f):
+        """Call f(k, v) whenever any setting changes."""
+        self._observers.append(f)
+
+    def key(self, k, fallback=None):
+        """Get a cached handle on a setting, populating it from fallback if unset."""
+        try:
+            return self._keys[k]
+        except KeyError:
+            key = self._keys[k] = Key(self, k, fallback)
+            return key
 
     def get(self, k, fallback=None):
         try:
             return self.settings[k]
         except KeyError:
-            if fallback:
+            if fallback is not None:
                 self.set(k, fallback)
                 return fallback
             else:
                 raise KeyError("No such setting: {}".format(k))
 
+    def flush(self):
+        """Atomically write pending changes to flash."""
+        if not self.dirty:
+            return
+        tmp = self.fn + ".tmp"
+        with blocking("settings.flush"):
+            with open(tmp, "w") as f:
+                dump(self.settings, f)
+            try:
+                os.rename(tmp, self.fn)
+            except OSError:  # some filesystems won't rename over a file
+                os.remove(self.fn)
+                os.rename(tmp, self.fn)
+        self.dirty = False
+
+    async def writer(self):
+        """Write changes out at most once every delay_ms."""
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.delay_ms / 1_000)
+            self._changed.clear()
+            self.flush()
+
+    def init(self, loop):
+        if self.dirty:
+            self._changed.set()
+        loop.create_task(self.writer())
+
 
-settings = Settings("settings.json")
+settings = Settings("settings.json", delay_ms=2_000)
@@ -0,0 +1,53 @@
+from os import urandom
+
+from . import clock, hal, irrigation, upython
+from .settings import settings
+
+if upython:
+    import ujson as json
+else:
+    import json
+
+# Status is rebuilt (and re-encoded) only when a reading, the valve, watering
+# or a setting changes.  The runtime in it is as of the last rebuild.
+_boot = int.from_bytes(urandom(4), "big")  # differs per boot, unlike ticks_ms()
+version = 0
+_report = None
+_encoded = None
+
+
+def invalidate(*_):
+    global version, _report, _encoded
+    version += 1
+    _report = None
+    _encoded = None
+
+
+def report():
+    """Get the current status as a dict, which must not be modified."""
+    global _report
+    if _report is None:
+        _report = hal.status()
+        _report["runtime"] = clock.timestr(clock.runtime())
+        _report.update(settings.settings)
+    return _report
+
+
+def encoded():
+    """Get the current status encoded as JSON, shared between requests."""
+    global _encoded
+    if _encoded is None:
+        _encoded = json.dumps(report())
+    return _encoded
+
+
+def etag():
+    """Get an ETag for the current status, unique across boots."""
+    return '"{:x}-{:x}"'.format(_boot, version)
+
+
+def init():
+    hal.temp_sensor.observers.append(invalidate)
+    hal.valve.observers.append(invalidate)
+    irrigation.auto_waterer.observers.append(invalidate)
+    settings.subscribe(invalidate)
@@ -0,0 +1,103 @@
+"""Opt-in accounting of how long each task runs between yields."""
+from . import ticks_diff, ticks_us, upython
+
+if upython:  # pragma: no cover
+    import gc
+
+    import uasyncio as asyncio  # pragma: no cover
+
+    def coroutine(f):
+        """Generators are already coroutines in MicroPython."""
+        return f
+
+else:
+    import asyncio
+    from types import coroutine
+
+stats = {}  # task name: TaskStats
+
+
+class TaskStats:
+    def __init__(self):
+        self.steps = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.alloc = 0
+
+    def record(self, us, alloc):
+        self.steps += 1
+        self.total_us += us
+        self.max_us = max(self.max_us, us)
+        self.alloc += max(alloc, 0)  # a collection during the step frees memory
+
+    def summary(self):
+        return {
+            "steps": self.steps,
+            "total_us": self.total_us,
+            "max_us": self.max_us,
+            "alloc": self.alloc if upython else None,
+        }
+
+
+def _name(coro):
+    try:
+        return coro.__name__
+    except AttributeError:  # MicroPython: <generator object 'name' at ...>
+        r = repr(coro)
+        return r.split("'")[1] if "'" in r else r
+
+
+def _mem_alloc():
+    return gc.mem_alloc() if upython else 0
+
+
+@coroutine
+def profile(coro, name=None):
+    """
+    Run coro one step at a time, recording how long each step takes.
+
+    Args:
+        coro: the coroutine to run.
+        name[str]: name to record under, by default the coroutine's name.
+
+    Returns: whatever coro returns.
+    """
+    st = stats.get(name or _name(coro))
+    if st is None:
+        st = stats[name or _name(coro)] = TaskStats()
+    v = None
+    exc = None
+    while True:
+        start = ticks_us()
+        alloc = _mem_alloc()
+        try:
+            if exc is None:
+                y = coro.send(v)
+            else:
+                y = coro.throw(exc)
+        except StopIteration as e:
+            return e.value
+        finally:
+            st.record(ticks_diff(ticks_us(), start), _mem_alloc() - alloc)
+        v = exc = None
+        try:
+            v = yield y
+        except BaseException as e:  # e.g. cancellation, passed on to coro
+            exc = e
+
+
+def install():
+    """Profile every task created from now on."""
+    create_task = asyncio.create_task
+
+    def _create_task(coro):
+        return create_task(profile(coro))
+
+    asyncio.create_task = _create_task
+    core = getattr(asyncio, "core", None)  # used by Loop.create_task and servers
+    if core:
+        core.create_task = _create_task
+
+
+def summary():
+    return {name: st.summary() for name, st in stats.items()}
@@ -31,6 +31,7 @@ class Valve:
         self.in2 = in2
         self.en.off()
         self._state = self.CLOSED
+        self.observers = []  # called with the valve whenever its state changes
         self.name = name
         self._logger = logging.getLogger(self.name)
         self.lock = asyncio.Lock()
@@ -63,11 +64,16 @@ class Valve:
             await asyncio.sleep(self.pulse_duration)
             self.en.off()
             if await self.achieved_state(end_state):
-                self._state = end_state
+                self._set_state(end_state)
                 self._logger.info(f"{'Opened' if on else 'Closed'} valve.")
                 return
         raise ValveError(f"Failed to set valve in {self.ATTEMPTS} attempts!")
 
+    def _set_state(self, state):
+        self._state = state
+        for f in self.observers:
+            f(self)
+
     @property
     def current_state(self):
         """Get the current valve state."""
@@ -87,10 +93,10 @@ class Valve:
         if val is not None:
             async with self.lock:
                 if val:
-                    self._state = self.OPENING
+                    self._set_state(self.OPENING)
                     await self._pulse(self.OPEN)
                 else:
-                    self._state = self.CLOSING
+                    self._set_state(self.CLOSING)
                     await self._pulse(self.CLOSED)
         return self._state
 
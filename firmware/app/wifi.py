@@ -0,0 +1,56 @@
+import logging
+
+import network
+import secrets
+import uasyncio as asyncio
+
+sta_if = network.WLAN(network.STA_IF)
+connected = asyncio.Event()
+logger = logging.getLogger(__name__)
+
+POLL_MS = 100
+CHECK_S = 10
+
+
+async def _wait_connected(timeout):
+    """Wait up to timeout seconds for the interface to come up."""
+    for _ in range(timeout * 1_000 // POLL_MS):
+        if sta_if.isconnected():
+            return True
+        await asyncio.sleep_ms(POLL_MS)
+    return sta_if.isconnected()
+
+
+async def keep_connected(timeout=20, max_backoff=300):
+    """
+    Connect to the network and reconnect whenever it drops.
+
+    Failed attempts are retried with exponential backoff so an outage doesn't
+    tie up the loop.
+
+    Args:
+        timeout[int]: seconds to wait for each attempt.
+        max_backoff[int]: longest wait in seconds between attempts.
+    """
+    backoff = 1
+    while True:
+        if await _wait_connected(timeout):
+            if not connected.is_set():
+                logger.info("Network config: {}".format(sta_if.ifconfig()))
+                connected.set()
+            backoff = 1
+            await asyncio.sleep(CHECK_S)
+            continue
+
+        if connected.is_set():
+            logger.warning("Lost network connection")
+            connected.clear()
+        logger.info("Not connected, retrying in {}s".format(backoff))
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, max_backoff)
+        sta_if.active(True)
+        sta_if.connect(secrets.wifi_SSID, secrets.wifi_PSK)
+
+
+def init(loop):
+    loop.create_task(keep_connected())
@@ -0,0 +1,52 @@
+class BufferedWriter:
+    """
+    Collect small writes to a response into segments of up to `size` bytes.
+
+    Usable in place of the response wherever `awrite` is called, e.g.
+    `picoweb.start_response(w, ...)`.  Use as an async context manager so the
+    last segment is flushed.
+    """
+
+    MSS = 1460  # typical TCP maximum segment size
+
+    def __init__(self, resp, size=MSS):
+        self.resp = resp
+        self.buf = bytearray(size)
+        self._mv = memoryview(self.buf)
+        self.n = 0
+        self.written = 0
+
+    async def awrite(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        size = len(data)
+        if self.n + size > len(self.buf):
+            await self.flush()
+            if size >= len(self.buf):
+                await self.resp.awrite(data)
+                self.written += size
+                return
+        self._mv[self.n : self.n + size] = data
+        self.n += size
+
+    awritestr = awrite  # used by picoweb's render_template
+
+    async def claim(self, size):
+        """Reserve size bytes in buf for the caller to fill in, returning the offset."""
+        if self.n + size > len(self.buf):
+            await self.flush()
+        offset = self.n
+        self.n += size
+        return offset
+
+    async def flush(self):
+        if self.n:
+            await self.resp.awrite(self._mv[: self.n])
+            self.written += self.n
+            self.n = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.flush()
@@ -11,9 +11,10 @@ def soft_reset():
     print("Unimported everything")
 
 
-def network_connect():
-    """Connect to the network."""
+def network_connect(timeout_ms=0):
+    """Start connecting to the network, waiting at most timeout_ms for it."""
     import secrets
+    from time import sleep_ms, ticks_diff, ticks_ms
 
     import network
 
@@ -22,13 +23,17 @@ def network_connect():
         print("connecting to network...")
         sta_if.active(True)
         sta_if.connect(secrets.wifi_SSID, secrets.wifi_PSK)
-        while not sta_if.isconnected():
-            pass
+        start = ticks_ms()
+        while not sta_if.isconnected() and ticks_diff(ticks_ms(), start) < timeout_ms:
+            sleep_ms(100)
     print("network config:", sta_if.ifconfig())
 
 
+persistent_handler = None
+
 try:
     import logging
+    from logging.handlers import DedupHandler
 
     logging.basicConfig(
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -39,12 +44,21 @@ try:
     sh.setFormatter(
         logging.Formatter("%(asctime)s - %(name)s - %(levelname)s: %(message)s")
     )
+    # collapse repeated records (e.g. a sensor failing every period) before
+    # they reach any handler
+    dedup = DedupHandler()
+    dedup.addHandler(sh)
     logging.root.handlers.clear()
-    logging.root.addHandler(sh)
+    logging.root.addHandler(dedup)
     # logger.addHandler(sh)
     logger.debug("Logger initialised")
 
+    # this imports the app package too, so there is no separate stage for it
+    from app import bootprof
+
+    bootprof.mark("logging, import app")
     network_connect()
+    bootprof.mark("network")
 
     import uos
 
@@ -58,8 +72,10 @@ try:
     print("import log")
     from app import log
 
-    logging.root.addHandler(log.rotating_handler)
+    dedup.addHandler(log.queue_handler)
+    persistent_handler = log.queue_handler
     logger.debug("Attached persistent handler")
+    bootprof.mark("persistent log")
 
     print("import app")
     import app
@@ -69,10 +85,13 @@ try:
 except Exception as e:
     print("Falling back....")
     print_exception(e)
-    network_connect()
+    network_connect(timeout_ms=30_000)
     try:
         logger.error(print_exception(e))
         logger.info("Running failsafe repl.")
+        if persistent_handler:
+            # the loop isn't running, so write out what's queued now
+            persistent_handler.flush()
     except Exception:
         print_exception(e)
         print("Running failsafe repl.")
@@ -20,3 +20,30 @@ def convert_vals(v):
         return vs[0]
     else:
         return vs
+
+
+def id_window(newest, since_id=None, until_id=None, limit=20):
+    """Convert an id range into (n, skip) for a log read newest-first.
+
+    Ids in the rotating logs are sequential, so the offset of a record is its
+    distance from the newest id.  since_id is exclusive, until_id inclusive.
+    """
+    until = newest if until_id is None else min(until_id, newest)
+    n = limit
+    if since_id is not None:
+        n = min(n, max(until - since_id, 0))
+    return n, newest - until
+
+
+def window(records, get_id, since_id=None, until_id=None, limit=20):
+    """Yield at most limit records with since_id < id <= until_id."""
+    for record in records:
+        if limit <= 0:
+            return
+        i = get_id(record)
+        if until_id is not None and i > until_id:
+            continue
+        if since_id is not None and i <= since_id:
+            continue
+        yield record
+        limit -= 1
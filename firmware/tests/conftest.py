@@ -1,5 +1,31 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+# after the standard library, so lib/logging doesn't shadow logging
+sys.path.append(str(Path(__file__).parent.parent.parent.resolve() / "lib"))
+# for the host-side decoders
+sys.path.append(str(Path(__file__).parent.parent.parent.resolve() / "experiments"))
 print(sys.path)
+
+
+class Response:
+    """Fake response (or stream writer) recording what is written to it."""
+
+    def __init__(self):
+        self.writes = []
+
+    async def awrite(self, data, off=0, sz=-1):
+        data = data.encode() if isinstance(data, str) else bytes(data)
+        self.writes.append(data[off:] if sz < 0 else data[off : off + sz])
+
+    @property
+    def data(self):
+        return b"".join(self.writes)
+
+
+@pytest.fixture
+def resp():
+    return Response()
@@ -0,0 +1,65 @@
+import math
+from datetime import datetime
+from types import SimpleNamespace
+
+import binlog
+import pytest
+
+graph = pytest.importorskip("app.graph")
+
+
+def reading(id, floats, bools):
+    return SimpleNamespace(
+        id=id, timestamp=(2021, 9, 1, 6, 0, id), floats=floats, bools=bools
+    )
+
+
+def test_layout_matches():
+    assert (graph.RECORD, graph.MAGIC) == (binlog.RECORD, binlog.MAGIC)
+    assert graph.RECORD_SIZE == binlog.RECORD_SIZE
+    assert len(graph.HEADER) == binlog.HEADER_SIZE
+
+
+def test_round_trip():
+    readings = [
+        reading(0, (21.5, 40.25), (True, False, True)),
+        reading(1, (None, 39.0), (False, True, False)),
+        reading(2, (math.nan, None), (False, False, False)),
+    ]
+    buf = bytearray(graph.HEADER + bytes(graph.RECORD_SIZE * len(readings)))
+    for i, r in enumerate(readings):
+        graph.pack_into(buf, len(graph.HEADER) + i * graph.RECORD_SIZE, r)
+    assert binlog.decode(bytes(buf)) == [
+        {
+            "id": 0,
+            "timestamp": datetime(2021, 9, 1, 6, 0, 0),
+            "soil_temperature": 21.5,
+            "soil_humidity": 40.25,
+            "valve": True,
+            "watering": False,
+            "auto_mode": True,
+        },
+        {
+            "id": 1,
+            "timestamp": datetime(2021, 9, 1, 6, 0, 1),
+            "soil_temperature": None,
+            "soil_humidity": 39.0,
+            "valve": False,
+            "watering": True,
+            "auto_mode": False,
+        },
+        {
+            "id": 2,
+            "timestamp": datetime(2021, 9, 1, 6, 0, 2),
+            "soil_temperature": None,
+            "soil_humidity": None,
+            "valve": False,
+            "watering": False,
+            "auto_mode": False,
+        },
+    ]
+
+
+def test_decode_rejects_truncated():
+    with pytest.raises(binlog.FormatError):
+        binlog.decode(graph.HEADER + bytes(graph.RECORD_SIZE - 1))
@@ -0,0 +1,28 @@
+import pytest
+from app import bootprof
+
+
+@pytest.fixture
+def fn(tmp_path, mocker):
+    mocker.patch("app.bootprof.stages", [])
+    return str(tmp_path / "boot_profile.json")
+
+
+def test_mark(fn):
+    bootprof.mark("a")
+    bootprof.mark("b")
+    assert [s[0] for s in bootprof.stages] == ["a", "b"]
+    assert bootprof.stages[0][1] <= bootprof.stages[1][1]
+
+
+def test_history_missing(fn):
+    assert bootprof.history(fn) == []
+
+
+def test_keeps_last_boots(fn):
+    for i in range(4):
+        bootprof.stages[:] = [["boot", i, None, None]]
+        bootprof.save("Soft reset", fn=fn, keep=3)
+    boots = bootprof.history(fn)
+    assert [b["stages"][0][1] for b in boots] == [1, 2, 3]
+    assert boots[-1]["reason"] == "Soft reset"
@@ -0,0 +1,94 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+LIB = Path(__file__).parent.parent.parent / "lib" / "logging"
+
+
+def load():
+    """Import lib/logging as mplogging, as it would shadow the standard library."""
+    spec = importlib.util.spec_from_file_location(
+        "mplogging", LIB / "__init__.py", submodule_search_locations=[str(LIB)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["mplogging"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+logging = load()
+from mplogging.handlers import DedupHandler  # noqa: E402
+
+
+class Collect:
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def dedup():
+    handler = DedupHandler()
+    collect = Collect()
+    handler.handlers.append(collect)
+    return handler, collect.records
+
+
+def record(t, msg="Failed to read sensor", level=logging.ERROR, args=()):
+    r = logging.LogRecord("hal", level, None, None, msg, args, None)
+    r.created = t
+    return r
+
+
+def messages(records):
+    return [r.msg % r.args for r in records]
+
+
+def test_collapses_periodic_failures(dedup):
+    handler, records = dedup
+    for i in range(6):
+        handler.emit(record(1_000 + 61 * i))
+    assert messages(records) == ["Failed to read sensor"]
+    handler.emit(record(1_000 + 61 * 6, "Read sensor", logging.INFO))
+    assert messages(records) == [
+        "Failed to read sensor",
+        "last message repeated 5 times",
+        "Read sensor",
+    ]
+
+
+def test_reports_long_runs(dedup):
+    handler, records = dedup
+    for i in range(121):
+        handler.emit(record(1_000 + 61 * i))
+    assert messages(records) == [
+        "Failed to read sensor",
+        "last message repeated 60 times",
+        "last message repeated 60 times",
+    ]
+
+
+def test_gap_ends_run(dedup):
+    handler, records = dedup
+    handler.emit(record(1_000))
+    handler.emit(record(1_060))
+    handler.emit(record(2_000))
+    assert messages(records) == [
+        "Failed to read sensor",
+        "last message repeated 1 times",
+        "Failed to read sensor",
+    ]
+
+
+def test_rate_limit(dedup):
+    handler, records = dedup
+    for i in range(12):
+        handler.emit(record(1_000 + i, "Read %d", args=(i,)))
+    handler.emit(record(1_060, "Read %d", args=(12,)))
+    assert messages(records) == (
+        ["Read %d" % i for i in range(10)] + ["2 messages suppressed", "Read 12"]
+    )
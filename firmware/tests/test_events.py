@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from app.events import Broker
+
+
+@pytest.fixture
+def broker():
+    return Broker(max_subscribers=2, queue_size=2, write_timeout=0.1)
+
+
+def test_max_subscribers(broker):
+    assert broker.subscribe()
+    assert broker.subscribe()
+    assert broker.subscribe() is None
+
+
+async def test_stream(broker):
+    written = []
+
+    async def write(msg):
+        written.append(msg)
+
+    s = broker.subscribe()
+    task = asyncio.create_task(broker.stream(s, write))
+    broker.publish("valve", {"valve": 10})
+    broker.publish("watering", {"watering": True})
+    await asyncio.sleep(0.01)
+    task.cancel()
+    assert written == [
+        'event: valve\ndata: {"valve": 10}\n\n',
+        'event: watering\ndata: {"watering": true}\n\n',
+    ]
+
+
+async def test_drop_slow(broker, mocker):
+    s = broker.subscribe()
+    for i in range(3):
+        broker.publish("reading", i)
+    assert s.dropped
+    assert not broker.subscribers
+    write = mocker.AsyncMock()
+    await broker.stream(s, write)
+    write.assert_not_called()
+
+
+async def test_write_timeout(broker):
+    async def write(msg):
+        await asyncio.sleep(1)
+
+    s = broker.subscribe()
+    broker.publish("reading", 1)
+    with pytest.raises(asyncio.TimeoutError):
+        await broker.stream(s, write)
+    assert not broker.subscribers
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+from app.jsonstream import dump
+from app.writer import BufferedWriter
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {},
+        [],
+        {"a": 1, "b": [1.5, None, True, "x\"y"], "c": {"d": (1, 2)}},
+        ["nested", [[{}]], {"k": "ü"}],
+        "plain",
+        7,
+    ],
+)
+async def test_matches_dumps(obj, resp):
+    async with BufferedWriter(resp, size=16) as w:
+        await dump(obj, w)
+    assert resp.data.decode() == json.dumps(obj)
+
+
+async def test_non_string_keys(resp):
+    async with BufferedWriter(resp) as w:
+        await dump({1: "a"}, w)
+    assert json.loads(resp.data) == {"1": "a"}
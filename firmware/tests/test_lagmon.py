@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from app.lagmon import LagMonitor, blocking
+
+
+@pytest.fixture
+def monitor():
+    return LagMonitor(buckets=(1, 10, 100), top=2, stall_ms=50)
+
+
+def test_histogram(monitor):
+    for lag in (0, 1, 5, 10, 50, 1000):
+        monitor.record(lag)
+    assert monitor.counts == [2, 2, 1, 1]
+    assert monitor.max == 1000
+
+
+def test_top_stalls(monitor):
+    monitor.note("flush", 60)
+    monitor.record(60)
+    monitor.record(200)
+    monitor.note("log", 5)
+    monitor.note("sensor", 80)
+    monitor.record(80)
+    monitor.record(10)
+    assert [s[:2] for s in monitor.stalls] == [[200, None], [80, "sensor"]]
+
+
+def test_interval(monitor):
+    for lag in (0, 10, 80):
+        monitor.record(lag)
+    assert monitor.interval() == (30, 80, 1)
+    assert monitor.interval() == (0, 0, 0)
+
+
+def test_blocking(monitor, mocker):
+    mocker.patch("app.lagmon.ticks_ms", side_effect=[100, 170])
+    with blocking("flush", monitor):
+        pass
+    monitor.record(70)
+    assert monitor.stalls[0][:2] == [70, "flush"]
+
+
+async def test_run(monitor):
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.25)
+    task.cancel()
+    assert sum(monitor.counts) == 2
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import struct
+
+import pytest
+from app.log import (
+    RECORD,
+    RECORD_SIZE,
+    LoggerNames,
+    PackedFormatter,
+    QueueHandler,
+    read,
+)
+from ringfile import RingFile
+
+
+def record(msg, level=logging.INFO, name="app", args=(), created=1_000):
+    r = logging.LogRecord(name, level, None, None, msg, args, None)
+    r.created = created
+    return r
+
+
+@pytest.fixture
+def queue():
+    written = []
+    handler = QueueHandler(written.append, size=4, batch=3, max_age_ms=100)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler, written
+
+
+async def test_writes_full_batch(queue):
+    handler, written = queue
+    handler.max_age_ms = 10_000
+    task = asyncio.create_task(handler.run())
+    handler.emit(record("a"))
+    handler.emit(record("b"))
+    await asyncio.sleep(0.02)
+    assert written == []
+    handler.emit(record("c"))
+    await asyncio.sleep(0.02)
+    assert written == ["a", "b", "c"]
+    task.cancel()
+
+
+async def test_writes_after_max_age(queue):
+    handler, written = queue
+    task = asyncio.create_task(handler.run())
+    handler.emit(record("a"))
+    await asyncio.sleep(0.05)
+    assert written == []
+    await asyncio.sleep(0.1)
+    assert written == ["a"]
+    task.cancel()
+
+
+def test_drops_when_full(queue):
+    handler, written = queue
+    for i in range(6):
+        handler.emit(record("%d", args=(i,)))
+    assert handler.dropped == 2
+    handler.flush()
+    assert written == ["0", "1", "2", "3", "Dropped 2 log records"]
+    handler.flush()
+    assert len(written) == 5
+    handler.emit(record("6"))
+    handler.flush()
+    assert written[-1] == "6"
+    assert handler.dropped == 2
+
+
+def test_flush_wraps(queue):
+    handler, written = queue
+    for i in range(3):
+        handler.emit(record("%d", args=(i,)))
+    handler.flush()
+    for i in range(3, 6):
+        handler.emit(record("%d", args=(i,)))
+    handler.flush()
+    assert written == [str(i) for i in range(6)]
+    assert handler.n == 0
+
+
+def test_level(queue):
+    handler, written = queue
+    handler.setLevel(logging.INFO)
+    handler.emit(record("a", logging.DEBUG))
+    handler.flush()
+    assert written == []
+
+
+def test_names(tmp_path):
+    fn = str(tmp_path / "names.json")
+    names = LoggerNames(fn)
+    assert names.id("a") == 0
+    assert names.id("b") == 1
+    assert names.id("a") == 0
+    assert LoggerNames(fn).names == []
+    names.save()
+    names = LoggerNames(fn)
+    assert not names.dirty
+    assert (names.id("b"), names.name(1), names.name(5)) == (1, "b", "?")
+
+
+def test_names_full(tmp_path, mocker):
+    mocker.patch.object(LoggerNames, "MAX", 2)
+    names = LoggerNames(str(tmp_path / "names.json"))
+    assert [names.id(n) for n in "abcd"] == [0, 1, 2, 2]
+
+
+def test_truncates_whole_characters(tmp_path):
+    formatter = PackedFormatter(LoggerNames(str(tmp_path / "names.json")), 0)
+    header = struct.pack(RECORD, 1_000, logging.INFO, 0)
+    for size, msg in ((5, b"aaaa"), (6, b"aaaa"), (7, "aaaa€".encode())):
+        formatter.size = RECORD_SIZE + size
+        assert formatter.format(record("aaaa€")) == header + msg
+    formatter.size = RECORD_SIZE + 1
+    assert formatter.format(record("€")) == header
+
+
+@pytest.fixture
+def syslog(tmp_path, mocker):
+    names = LoggerNames(str(tmp_path / "names.json"))
+    ring = RingFile(str(tmp_path / "syslog.bin"), slots=8, slot_size=32)
+    mocker.patch("app.log.names", names)
+    mocker.patch("app.log.ring", ring)
+    formatter = PackedFormatter(names, 32 - struct.calcsize(RingFile.SLOT_HEADER))
+    # record i is at time 100 + i
+    for i, (level, name) in enumerate(
+        [
+            (logging.INFO, "a"),
+            (logging.ERROR, "a"),
+            (logging.INFO, "b"),
+            (logging.WARNING, "b"),
+            (logging.DEBUG, "a"),
+        ]
+    ):
+        ring.append(formatter.format(record(str(i), level, name, created=100 + i)))
+    return ring
+
+
+def ids(records):
+    return [r[0] for r in records]
+
+
+def test_read(syslog):
+    assert list(read(n=2)) == [
+        (4, 104, logging.DEBUG, "a", "4"),
+        (3, 103, logging.WARNING, "b", "3"),
+    ]
+    assert ids(read(skip=1)) == [3, 2, 1, 0]
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        ({"level": logging.WARNING}, [3, 1]),
+        ({"logger": "b"}, [3, 2]),
+        ({"logger": "c"}, []),
+        ({"since": 102}, [4, 3, 2]),
+        ({"until": 101}, [1, 0]),
+        ({"since": 101, "until": 103, "level": logging.INFO}, [3, 2, 1]),
+        ({"since_id": 1, "until_id": 3}, [3, 2]),
+        ({"until_id": 10}, [4, 3, 2, 1, 0]),
+        ({"logger": "a", "n": 2}, [4, 1]),
+    ],
+)
+def test_read_filters(syslog, kwargs, expected):
+    assert ids(read(**kwargs)) == expected
+
+
+def test_read_overwritten(syslog):
+    for i in range(5):
+        syslog.append(struct.pack(RECORD, 200 + i, logging.INFO, 0) + b"x")
+    assert ids(read(n=20)) == list(range(9, 1, -1))
+    assert ids(read(n=20, until_id=3)) == [3, 2]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from app import metrics
+
+
+@pytest.fixture
+def registry():
+    return []
+
+
+@pytest.fixture
+def export(resp):
+    def _export(registry):
+        resp.writes.clear()
+        asyncio.run(metrics.write(resp, registry))
+        return resp.data.decode().splitlines()
+
+    return _export
+
+
+def test_counter(registry, export):
+    c = metrics.Counter("hits", "Hits.", registry)
+    c.inc()
+    c.inc(metrics.labels(route="/"), 2)
+    assert export(registry) == [
+        "# HELP hits Hits.",
+        "# TYPE hits counter",
+        "hits 1",
+        'hits{route="/"} 2',
+    ]
+
+
+def test_gauge(registry, export):
+    metrics.Gauge("free", "Free.", lambda: 3, registry)
+    g = metrics.Gauge("unset", "Never set.", registry=registry)
+    assert export(registry)[2] == "free 3"
+    g.set(1.5)
+    assert export(registry)[-1] == "unset 1.5"
+
+
+def test_histogram(registry, export):
+    h = metrics.Histogram("t", "Time.", (10, 100), registry)
+    for v in (5, 50, 500):
+        h.observe(v, 'route="/"')
+    assert export(registry)[2:] == [
+        't_bucket{route="/",le="10"} 1',
+        't_bucket{route="/",le="100"} 2',
+        't_bucket{route="/",le="+Inf"} 3',
+        't_sum{route="/"} 555',
+        't_count{route="/"} 3',
+    ]
+
+
+def handler(req, resp):
+    yield from resp.awrite(b"hello")
+    yield from resp.awrite(b"xxworldxx", 2, 5)
+    if req == "fail":
+        raise ValueError()
+
+
+def test_timed(mocker):
+    for m in (metrics.requests, metrics.errors, metrics.sent):
+        mocker.patch.object(m, "values", {})
+    resp = mocker.Mock()
+    resp.awrite.side_effect = lambda *args: iter(())
+    f = metrics.timed("/x", handler)
+    list(f("ok", resp))
+    with pytest.raises(ValueError):
+        list(f("fail", resp))
+    label = 'route="/x"'
+    assert metrics.requests.values == {label: 2}
+    assert metrics.errors.values == {label: 1}
+    assert metrics.sent.values == {label: 20}
@@ -0,0 +1,83 @@
+import os
+import struct
+
+import pytest
+from ringfile import RingFile
+
+
+@pytest.fixture
+def fn(tmp_path):
+    return str(tmp_path / "ring.bin")
+
+
+def test_create_and_reopen(fn):
+    r = RingFile(fn, slots=4, slot_size=16)
+    assert os.path.getsize(fn) == struct.calcsize(RingFile.HEADER) + 4 * 16
+    assert r.append(b"a") == 0
+    assert r.append(b"b") == 1
+    r.close()
+    r = RingFile(fn, slots=4, slot_size=16)
+    assert r.seq == 2
+    assert list(r.records()) == [(0, b"a"), (1, b"b")]
+
+
+def test_layout_change_recreates(fn):
+    RingFile(fn, slots=4, slot_size=16).append(b"a")
+    r = RingFile(fn, slots=5, slot_size=16)
+    assert r.seq == 0
+    assert list(r.records()) == []
+
+
+def test_wrap_around(fn):
+    r = RingFile(fn, slots=4, slot_size=16)
+    for i in range(6):
+        r.append(b"%d" % i)
+    assert (r.first, r.seq) == (2, 6)
+    assert list(r.records()) == [(i, b"%d" % i) for i in range(2, 6)]
+    assert list(r.records(since=3, until=5)) == [(3, b"3"), (4, b"4")]
+
+
+def test_truncates(fn):
+    r = RingFile(fn, slots=2, slot_size=16)
+    r.append(b"x" * 20)
+    assert r.read(0) == b"x" * 10
+    assert r.read(0, size=3) == b"xxx"
+
+
+def test_read_out_of_range(fn):
+    r = RingFile(fn, slots=2, slot_size=16)
+    for i in range(3):
+        r.append(b"%d" % i)
+    assert r.read(0) is None  # overwritten
+    assert r.read(3) is None  # not written yet
+    assert r.read(-1) is None
+    assert r.read(2) == b"2"
+
+
+def _set_header_seq(fn, seq):
+    with open(fn, "r+b") as f:
+        f.seek(struct.calcsize("<4sHH"))
+        f.write(struct.pack("<I", seq))
+
+
+def test_roll_forward_stale_header(fn):
+    r = RingFile(fn, slots=4, slot_size=16)
+    for i in range(3):
+        r.append(b"%d" % i)
+    r.close()
+    _set_header_seq(fn, 1)  # as if power was lost before the header writes
+    r = RingFile(fn, slots=4, slot_size=16)
+    assert r.seq == 3
+    assert r.read(2) == b"2"
+
+
+def test_torn_slot_not_accepted(fn):
+    r = RingFile(fn, slots=4, slot_size=16)
+    r.append(b"0")
+    # power lost after the payload of record 1, before its slot header
+    r._f.seek(r._offset(1))
+    r._f.write(r._blank_header + b"torn")
+    r.close()
+    r = RingFile(fn, slots=4, slot_size=16)
+    assert r.seq == 1
+    assert list(r.records()) == [(0, b"0")]
@@ -0,0 +1,119 @@
+import asyncio
+from time import mktime
+
+import pytest
+from app.schedule import Daily, Every, Scheduler, hours_schedules, parse_schedules
+
+
+def t(*args):
+    """Local time at 2021-09-01 (a Wednesday) + args."""
+    return int(mktime((2021, 9, 1) + tuple(args) + (0,) * (3 - len(args)) + (0, 0, -1)))
+
+
+def test_daily():
+    assert Daily(6).next_after(t(5, 59)) == t(6)
+    assert Daily(6).next_after(t(6)) == t(6) + 86400
+    assert Daily(12, 30).next_after(t(6)) == t(12, 30)
+
+
+def test_daily_weekdays():
+    assert Daily(6, weekdays=[2]).next_after(t(5)) == t(6)
+    assert Daily(6, weekdays=[4]).next_after(t(5)) == t(6) + 2 * 86400
+    assert Daily(6, weekdays=[2]).next_after(t(7)) == t(6) + 7 * 86400
+    assert Daily(6, weekdays=[]).next_after(t(7)) is None
+
+
+def test_every():
+    assert Every(300).next_after(100) == 400
+
+
+@pytest.fixture
+def scheduler():
+    return Scheduler()
+
+
+def test_runs_when_due(scheduler, mocker):
+    f = mocker.Mock()
+    job = scheduler.add(Daily(6), f, "f")
+    scheduler.run_pending(t(5))
+    assert job.due == t(6)
+    scheduler.run_pending(t(5, 59))
+    f.assert_not_called()
+    scheduler.run_pending(t(6))
+    f.assert_called_once_with(job)
+    assert job.due == t(6) + 86400
+
+
+def test_catch_up_once(scheduler, mocker):
+    f = mocker.Mock()
+    scheduler.add(Every(60), f, "f", grace=600)
+    scheduler.run_pending(0)
+    scheduler.run_pending(300)
+    assert f.call_count == 1
+    scheduler.run_pending(1000)
+    assert f.call_count == 1
+
+
+def test_clock_backwards(scheduler, mocker):
+    job = scheduler.add(Daily(6), mocker.Mock(), "f")
+    scheduler.run_pending(t(5) + 86400 * 365)
+    scheduler.run_pending(t(5))
+    assert job.due == t(6)
+
+
+async def test_run(scheduler, mocker):
+    mocker.patch("app.schedule.time", side_effect=lambda: asyncio.get_running_loop().time())
+    f = mocker.Mock()
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0)
+    scheduler.add(Every(0.1), f, "f")
+    await asyncio.sleep(0.35)
+    task.cancel()
+    assert f.call_count == 3
+
+
+def test_reset_after_clock_set(scheduler, mocker):
+    f = mocker.Mock()
+    job = scheduler.add(Daily(6), f, "f")
+    scheduler.run_pending(t(5) - 20 * 365 * 86400)
+    scheduler.reset()
+    scheduler.run_pending(t(5))
+    assert job.due == t(6)
+    scheduler.run_pending(t(6))
+    f.assert_called_once_with(job)
+
+
+def test_parse_schedules():
+    a, b = parse_schedules("6:01/30/0-4;12:01")
+    assert (a.hour, a.minute, a.duration, a.weekdays) == (6, 1, 30, [0, 1, 2, 3, 4])
+    assert (b.hour, b.minute, b.duration, b.weekdays) == (12, 1, None, None)
+    assert parse_schedules("7//06")[0].weekdays == [0, 6]
+    assert parse_schedules(6)[0].hour == 6
+    assert parse_schedules("") == []
+
+
+def test_hours_schedules():
+    # watering_hours set through the settings API are floats
+    assert hours_schedules([6.0, 12.0]) == "6:01;12:01"
+    assert [d.hour for d in parse_schedules(hours_schedules([6.0, 12.0]))] == [6, 12]
+    assert hours_schedules([]) == ""
+
+
+@pytest.mark.parametrize(
+    "v", [[6.0, 1.0], [[6, 1]], "25:00", "6:60", "6:01/x", "6/30/7", "6/1/2/3", True]
+)
+def test_parse_schedules_invalid(v):
+    with pytest.raises(ValueError):
+        parse_schedules(v)
+
+
+def test_held_until_clock_set(mocker):
+    scheduler = Scheduler(clock_set=False)
+    daily = scheduler.add(Daily(6), mocker.Mock(), "daily")
+    every = scheduler.add(Every(60), mocker.Mock(), "every")
+    scheduler.run_pending(t(5))
+    assert daily.due is None
+    assert every.due == t(5) + 60
+    scheduler.set_clock()
+    scheduler.run_pending(t(5))
+    assert daily.due == t(6)
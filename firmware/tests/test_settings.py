@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+
+import pytest
+from app.settings import Settings
+
+
+@pytest.fixture
+def fn(tmp_path):
+    return str(tmp_path / "settings.json")
+
+
+def test_write_through(fn):
+    s = Settings(fn)
+    s.set("a", 1)
+    with open(fn) as f:
+        assert json.load(f) == {"created": True, "a": 1}
+
+
+def test_deferred(fn):
+    s = Settings(fn, delay_ms=100)
+    s.set("a", 1)
+    assert s.get("b", 2) == 2
+    assert s.dirty
+    with pytest.raises(FileNotFoundError):
+        open(fn)
+    s.flush()
+    assert not s.dirty
+    assert Settings(fn).settings == {"created": True, "a": 1, "b": 2}
+
+
+async def test_writer_coalesces(fn, mocker):
+    s = Settings(fn, delay_ms=100)
+    flush = mocker.spy(s, "flush")
+    s.init(asyncio.get_running_loop())
+    await asyncio.sleep(0)
+    for i in range(5):
+        s.set("a", i)
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.2)
+    assert flush.call_count == 1
+    assert Settings(fn).get("a") == 4
+
+
+def test_falsy_fallback(fn):
+    s = Settings(fn)
+    assert s.get("a", False) is False
+    assert s.key("b", "").value == ""
+    assert Settings(fn).settings == {"created": True, "a": False, "b": ""}
+    with pytest.raises(KeyError):
+        s.get("c")
+
+
+def test_recover_from_tmp(fn):
+    s = Settings(fn)
+    s.set("a", 1)
+    os.rename(fn, fn + ".tmp")
+    assert Settings(fn).get("a") == 1
+
+
+async def test_key(fn):
+    s = Settings(fn)
+    key = s.key("a", 1)
+    assert key is s.key("a")
+    assert key.value == 1
+    seen = []
+    key.subscribe(seen.append)
+    waiter = asyncio.create_task(key.wait())
+    await asyncio.sleep(0)
+    s.set("a", 2)
+    assert await waiter == 2
+    key.set(3)
+    assert s.get("a") == 3
+    assert seen == [2, 3]
+
+
+def test_subscribe(fn, mocker):
+    s = Settings(fn)
+    f = mocker.Mock()
+    s.subscribe(f)
+    s.set("a", 1)
+    f.assert_called_once_with("a", 1)
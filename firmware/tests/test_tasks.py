@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+from app import tasks
+
+
+@pytest.fixture(autouse=True)
+def stats(mocker):
+    return mocker.patch("app.tasks.stats", {})
+
+
+async def work(n):
+    for _ in range(n):
+        await asyncio.sleep(0)
+    return n
+
+
+async def test_profile(stats):
+    assert await tasks.profile(work(3)) == 3
+    st = stats["work"]
+    assert st.steps == 4
+    assert st.max_us <= st.total_us
+
+
+async def test_named(stats):
+    await tasks.profile(work(1), "a")
+    await tasks.profile(work(1), "a")
+    assert tasks.summary()["a"]["steps"] == 4
+
+
+async def test_cancel(stats):
+    task = asyncio.ensure_future(tasks.profile(work(100), "w"))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert stats["w"].steps == 2
@@ -0,0 +1,28 @@
+from app.util import id_window, window
+
+
+def test_id_window_since():
+    assert id_window(100, since_id=90) == (10, 0)
+    assert id_window(100, since_id=50, limit=20) == (20, 0)
+    assert id_window(100, since_id=100) == (0, 0)
+    assert id_window(100, since_id=120) == (0, 0)
+
+
+def test_id_window_until():
+    assert id_window(100, until_id=80, limit=5) == (5, 20)
+    assert id_window(100, until_id=150, limit=5) == (5, 0)
+    assert id_window(100, since_id=70, until_id=80) == (10, 20)
+
+
+def test_window():
+    records = list(range(100, 80, -1))
+    assert list(window(records, int, since_id=95)) == [100, 99, 98, 97, 96]
+    assert list(window(records, int, until_id=90, limit=3)) == [90, 89, 88]
+    assert list(window(records, int, since_id=85, until_id=88)) == [88, 87, 86]
+
+
+def test_window_append_race():
+    # 101 was appended after the newest id (100) was read
+    n, skip = id_window(100, since_id=95)
+    records = list(range(101, 80, -1))[skip:]
+    assert list(window(records, int, 95, 100, n)) == [100, 99, 98, 97, 96]
@@ -76,6 +76,14 @@ async def test_fail(valve):
         await valve.state(True)
 
 
+async def test_observers(valve, mocker):
+    f = mocker.Mock()
+    valve.observers.append(f)
+    await valve.state(True)
+    assert f.call_count == 2
+    f.assert_called_with(valve)
+
+
 async def test_pulse_duration(valve):
     assert valve.pulse_duration == 0.1
 
@@ -0,0 +1,40 @@
+import struct
+
+from app.writer import BufferedWriter
+
+
+async def test_coalesces(resp):
+    async with BufferedWriter(resp, size=8) as w:
+        for c in "abcdefghij":
+            await w.awrite(c)
+    assert resp.writes == [b"abcdefgh", b"ij"]
+    assert w.written == 10
+
+
+async def test_large_write(resp):
+    async with BufferedWriter(resp, size=4) as w:
+        await w.awrite("ab")
+        await w.awrite(b"0123456789")
+        await w.awrite("c")
+    assert resp.writes == [b"ab", b"0123456789", b"c"]
+
+
+async def test_claim(resp):
+    async with BufferedWriter(resp, size=8) as w:
+        for i in range(3):
+            struct.pack_into("<I", w.buf, await w.claim(4), i)
+    assert b"".join(resp.writes) == struct.pack("<3I", 0, 1, 2)
+    assert len(resp.writes) == 2
+
+
+async def test_render_template(resp):
+    # what picoweb's WebApp.render_template does with the writer it is given
+    def template(name):
+        yield "<p>"
+        yield name
+        yield "</p>"
+
+    async with BufferedWriter(resp) as w:
+        for s in template("hi"):
+            await w.awritestr(s)
+    assert resp.writes == [b"<p>hi</p>"]
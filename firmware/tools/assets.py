@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Build gzipped, content-hashed copies of static assets.
+
+Usage: assets.py MANIFEST STATIC_DIR FILE...
+
+Each FILE under STATIC_DIR is copied to STATIC_DIR/build/ with a hash of its
+content in the name, next to a gzipped copy if that is smaller.  MANIFEST is
+written as a python module mapping each FILE (relative to STATIC_DIR) to its
+built name, for the device to link to, and listing which are gzipped.
+"""
+
+import gzip
+import hashlib
+import sys
+from pathlib import Path
+
+
+def build(static: Path, fn: Path) -> (str, bool):
+    data = fn.read_bytes()
+    digest = hashlib.sha1(data).hexdigest()[:8]
+    name = fn.relative_to(static)
+    out = Path("build") / name.parent / f"{name.stem}.{digest}{name.suffix}"
+    (static / out).parent.mkdir(parents=True, exist_ok=True)
+    (static / out).write_bytes(data)
+    compressed = gzip.compress(data, 9, mtime=0)
+    gzipped = len(compressed) < len(data)
+    if gzipped:
+        (static / out).with_name(out.name + ".gz").write_bytes(compressed)
+    print(f"{name}: {len(data)} bytes, {len(compressed)} gzipped")
+    return out.as_posix(), gzipped
+
+
+def main(manifest: str, static: str, *files: str):
+    static = Path(static)
+    assets = {}
+    gzipped = []
+    for fn in files:
+        out, gz = build(static, Path(fn))
+        assets[Path(fn).relative_to(static).as_posix()] = out
+        if gz:
+            gzipped.append(out)
+    lines = ["# Generated by tools/assets.py: do not edit.\n", "ASSETS = {\n"]
+    lines += [f"    {k!r}: {v!r},\n" for k, v in sorted(assets.items())]
+    lines += ["}\n"]
+    if gzipped:
+        lines += ["GZIPPED = {\n"]
+        lines += [f"    {v!r},\n" for v in sorted(gzipped)]
+        lines += ["}\n"]
+    else:
+        lines += ["GZIPPED = set()\n"]
+    Path(manifest).write_text("".join(lines))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,45 @@
+"""Measure how many log calls per second lib/logging manages.
+
+Run on the device, e.g. `mpremote run tools/bench_logging.py`, before and
+after changing lib/logging to compare.
+"""
+
+import logging
+
+from utime import ticks_diff, ticks_ms
+
+N = 2_000
+
+
+class NullStream:
+    def write(self, s):
+        pass
+
+
+def bench(name, f, n=N):
+    start = ticks_ms()
+    for _ in range(n):
+        f("Read sensor: %s %s", 21.5, 40)
+    ms = max(ticks_diff(ticks_ms(), start), 1)
+    print("{:<24} {:>8.0f} records/s".format(name, n * 1_000 / ms))
+
+
+def main():
+    logger = logging.getLogger("bench")
+    handler = logging.StreamHandler(NullStream())
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s: %(message)s")
+    )
+    logging.root.handlers.clear()
+    logging.root.addHandler(handler)
+    logging.root.setLevel(logging.INFO)
+
+    bench("disabled (debug)", logger.debug)
+    bench("formatted (info)", logger.info)
+    handler.setFormatter(logging.Formatter("{name} - {levelname}: {message}", style="{"))
+    bench("formatted, { style", logger.info)
+    handler.setLevel(logging.ERROR)
+    bench("rejected by handler", logger.info)
+
+
+main()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""Compile a utemplate template to python ahead of time.
+
+Usage: compile_template.py TEMPLATE OUTPUT
+
+Needs utemplate on the python path.  The output is what
+utemplate.compiled.Loader expects to find, e.g. index.html -> index_html.py.
+"""
+
+import sys
+from pathlib import Path
+
+from utemplate import source
+
+
+def main(template: str, output: str):
+    template = Path(template)
+    loader = source.Loader(None, str(template.parent))
+    with template.open() as f_in, open(output, "w") as f_out:
+        source.Compiler(f_in, f_out, loader=loader).compile()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
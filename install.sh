@@ -1,11 +1,21 @@
 #!/bin/sh
+# usage: install.sh DIST_DIR FILE
+# Upload FILE to the device at the path DIST_DIR has under ../dist/, and keep a
+# copy in DIST_DIR so make knows it is up to date.
 set -e
 hostname=$(cat ../.hostname)
 password=$(cat ../.password)
-mpfshell -o ws:$hostname,$password -n -c "putc $2"
+remote="${1#../dist/}$(basename "$2")"
+cmd="put $2 $remote"
+case "$remote" in
+# the importer prefers X.py to X.mpy, so remove any source left from an
+# earlier install or it keeps running instead of the new bytecode
+*.mpy) cmd="$cmd; rm ${remote%.mpy}.py" ;;
+esac
+mpfshell -o ws:$hostname,$password -n -c "$cmd"
 mpfshell -o ws:$hostname,$password -n -c "put .runsafe"
 port="/dev/ttyUSB0"
-# mpfshell -o ser:$port -n -c "putc $2"
+# mpfshell -o ser:$port -n -c "$cmd"
 mkdir -p "$1"
 cp "$2" "$1"
 touch "updated"
@@ -1,7 +1,11 @@
 import sys
 
-import uio
-import utime
+try:
+    import uio
+    import utime
+except ImportError:  # CPython, e.g. for tests
+    import io as uio
+    import time as utime
 
 CRITICAL = 50
 ERROR = 40
@@ -19,10 +23,31 @@ _level_dict = {
 }
 
 
+_NEVER = 1 << 30  # above any level: nothing will handle the record
+
+# Bumped whenever a level or handler changes, invalidating cached thresholds.
+_generation = 0
+
+
+def _invalidate():
+    global _generation
+    _generation += 1
+
+
 def addLevelName(level, name):
     _level_dict[level] = name
 
 
+def getLevelName(level):
+    """Get the name of a level, or the level given its name."""
+    if isinstance(level, str):
+        for k, v in _level_dict.items():
+            if v == level:
+                return k
+        return "Level %s" % level
+    return _level_dict.get(level, "Level %s" % level)
+
+
 class Logger:
 
     level = NOTSET
@@ -31,6 +56,18 @@ class Logger:
         self.name = name
         self.handlers = None
         self.parent = None
+        self._generation = -1
+        self._dest = self  # logger whose level and handlers apply
+        self._threshold = _NEVER  # lowest level any handler would accept
+
+    def _update(self):
+        dest = self
+        while dest.level == NOTSET and dest.parent:
+            dest = dest.parent
+        self._dest = dest
+        levels = [h.level for h in dest.handlers or ()]
+        self._threshold = max(dest.level, min(levels)) if levels else _NEVER
+        self._generation = _generation
 
     def _level_str(self, level):
         l = _level_dict.get(level)
@@ -40,22 +77,21 @@ class Logger:
 
     def setLevel(self, level):
         self.level = level
+        _invalidate()
 
     def isEnabledFor(self, level):
-        return level >= self.level
-
-    def log(self, level, msg, *args):
-        dest = self
-        while dest.level == NOTSET and dest.parent:
-            dest = dest.parent
-        if level >= dest.level:
-            record = LogRecord(
-                self.name, level, None, None, msg, args, None, None, None
-            )
-
-            if dest.handlers:
-                for hdlr in dest.handlers:
-                    hdlr.emit(record)
+        if self._generation != _generation:
+            self._update()
+        return level >= self._dest.level
+
+    def log(self, level, msg, *args, exc_info=None):
+        if self._generation != _generation:
+            self._update()
+        if level < self._threshold:
+            return
+        record = LogRecord(self.name, level, None, None, msg, args, exc_info)
+        for hdlr in self._dest.handlers:
+            hdlr.emit(record)
 
     def debug(self, msg, *args):
         self.log(DEBUG, msg, *args)
@@ -75,9 +111,8 @@ class Logger:
         self.log(CRITICAL, msg, *args)
 
     def exc(self, e, msg, *args):
-        buf = uio.StringIO()
-        sys.print_exception(e, buf)
-        self.log(ERROR, msg + "\n" + buf.getvalue(), *args)
+        # the traceback is only formatted if a handler formats the record
+        self.log(ERROR, msg, *args, exc_info=e)
 
     def exception(self, msg, *args):
         self.exc(sys.exc_info()[1], msg, *args)
@@ -86,6 +121,7 @@ class Logger:
         if self.handlers is None:
             self.handlers = []
         self.handlers.append(hdlr)
+        _invalidate()
 
 
 def getLogger(name=None):
@@ -150,6 +186,7 @@ class Handler:
 
     def setLevel(self, level):
         self.level = level
+        _invalidate()
 
 
 class StreamHandler(Handler):
@@ -203,39 +240,44 @@ class Formatter:
             raise ValueError("Style must be one of: %, {")
 
         self.style = style
+        # Work out once whether fmt needs the time rather than searching it for
+        # every record, and remember the last time formatted as consecutive
+        # records usually share it.
+        if style == "%":
+            self._uses_time = "%(asctime)" in self.fmt
+        else:
+            self._uses_time = "{asctime" in self.fmt
+        self._last_time = None
+        self._last_asctime = None
 
     def usesTime(self):
-        if self.style == "%":
-            return "%(asctime)" in self.fmt
-        elif self.style == "{":
-            return "{asctime" in self.fmt
+        return self._uses_time
 
     def format(self, record):
         # The message attribute of the record is computed using msg % args.
-        record.message = record.msg % record.args
+        record.message = record.msg % record.args if record.args else record.msg
 
         # If the formatting string contains '(asctime)', formatTime() is called to
         # format the event time.
-        if self.usesTime():
-            record.asctime = self.formatTime(record, self.datefmt)
+        if self._uses_time:
+            if record.created != self._last_time:
+                self._last_time = record.created
+                self._last_asctime = self.formatTime(record, self.datefmt)
+            record.asctime = self._last_asctime
 
         # If there is exception information, it is formatted using formatException()
         # and appended to the message. The formatted exception information is cached
         # in attribute exc_text.
         if record.exc_info is not None:
-            record.exc_text += self.formatException(record.exc_info)
+            if record.exc_text is None:
+                record.exc_text = self.formatException(record.exc_info)
             record.message += "\n" + record.exc_text
 
         # The record’s attribute dictionary is used as the operand to a string
         # formatting operation.
         if self.style == "%":
             return self.fmt % record.__dict__
-        elif self.style == "{":
-            return self.fmt.format(**record.__dict__)
-        else:
-            raise ValueError(
-                "Style {0} is not supported by logging.".format(self.style)
-            )
+        return self.fmt.format(**record.__dict__)
 
     def formatTime(self, record, datefmt=None):
         assert datefmt is None  # datefmt is not supported
@@ -243,7 +285,10 @@ class Formatter:
         return "{0}-{1}-{2} {3}:{4}:{5}".format(*ct)
 
     def formatException(self, exc_info):
-        raise NotImplementedError()
+        """Format the traceback of exc_info, which is an exception instance."""
+        buf = uio.StringIO()
+        sys.print_exception(exc_info, buf)
+        return buf.getvalue()
 
     def formatStack(self, stack_info):
         raise NotImplementedError()
@@ -264,6 +309,7 @@ class LogRecord:
         self.msg = msg
         self.args = args
         self.exc_info = exc_info
+        self.exc_text = None
         self.func = func
         self.sinfo = sinfo
 
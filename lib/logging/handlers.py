@@ -1,6 +1,7 @@
 import os
 import sys
-from . import Handler
+from ringfile import RingFile
+from . import WARNING, Handler, LogRecord
 
 
 def try_remove(fn: str) -> None:
@@ -62,3 +63,99 @@ class RotatingFileHandler(Handler):
             f.write(msg + "\n")
 
         self._counter += s_len
+
+
+class RingFileHandler(Handler):
+    """A log handler writing to a RingFile.
+
+    Takes the same arguments as `RotatingFileHandler` and preallocates the
+    same total space, maxBytes * (backupCount + 1), so it can be swapped in.
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, slot_size=128):
+        super().__init__()
+        size = maxBytes * (backupCount + 1)
+        slots = max(size // slot_size, 1) if size else 256
+        self.ring = RingFile(filename, slots, slot_size)
+
+    def emit(self, record):
+        """Write to the next slot."""
+        if record.levelno >= self.level:
+            self.ring.append(self.formatter.format(record).encode())
+
+    def close(self):
+        self.ring.close()
+
+
+class DedupHandler(Handler):
+    """Pass records on to other handlers, collapsing repeats and rate-limiting.
+
+    A record which repeats the previous one from the same logger within
+    `window` seconds of the last repeat is only counted, so a fault logged
+    every period collapses however long it lasts (the window should be a few
+    periods long).  A "last message repeated N times" record is passed on
+    before the next different record, after a gap longer than the window, or
+    every `report` seconds while the repeats go on.  Each logger may also pass
+    on at most `rate` records every `per` seconds, and the number suppressed
+    is reported once it may log again.  Records are checked before anything
+    formats them, so a repeated traceback is never formatted.
+    """
+
+    def __init__(self, window=300, rate=10, per=60, report=3600):
+        super().__init__()
+        self.handlers = []
+        self.window = window
+        self.rate = rate
+        self.per = per
+        self.report = report
+        # logger name: [key, time last seen, repeats, time last reported]
+        self._last = {}
+        self._counts = {}  # logger name: [period start, passed on, suppressed]
+
+    def addHandler(self, hdlr):
+        self.handlers.append(hdlr)
+
+    def _pass(self, record):
+        for hdlr in self.handlers:
+            hdlr.emit(record)
+
+    def _note(self, record, level, msg, n):
+        self._pass(LogRecord(record.name, level, None, None, msg, (n,), None))
+
+    def _allow(self, record):
+        counts = self._counts.get(record.name)
+        if counts is None or record.created - counts[0] >= self.per:
+            if counts and counts[2]:
+                self._note(record, WARNING, "%d messages suppressed", counts[2])
+            counts = self._counts[record.name] = [record.created, 0, 0]
+        if counts[1] >= self.rate:
+            counts[2] += 1
+            return False
+        counts[1] += 1
+        return True
+
+    def _repeated(self, record, last):
+        self._note(record, last[0][0], "last message repeated %d times", last[2])
+        last[2] = 0
+        last[3] = record.created
+
+    def emit(self, record):
+        """Pass the record on unless it is a repeat or its logger is over the rate."""
+        if record.levelno < self.level:
+            return
+        e = record.exc_info
+        key = (record.levelno, record.msg, record.args, e and type(e), e and e.args)
+        now = record.created
+        last = self._last.get(record.name)
+        if last is not None:
+            if last[0] == key and now - last[1] < self.window:
+                last[1] = now
+                last[2] += 1
+                if now - last[3] >= self.report:
+                    self._repeated(record, last)
+                return
+            if last[2]:
+                self._repeated(record, last)
+        self._last[record.name] = [key, now, 0, now]
+        if self._allow(record):
+            self._pass(record)
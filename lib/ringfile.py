@@ -0,0 +1,123 @@
+import struct
+
+
+class RingFile:
+    """A log of fixed-size slots in one preallocated file, overwriting the oldest.
+
+    The file starts with a header holding the slot size, the number of slots
+    and the sequence number of the next record.  Record ``seq`` always lives
+    in slot ``seq % slots``, prefixed with its sequence number and length, so
+    appending is an in-place write and any record still held can be read
+    directly by sequence number.
+    """
+
+    MAGIC = b"RING"
+    HEADER = "<4sHHI"  # magic, slot size, slots, next sequence number
+    SLOT_HEADER = "<IH"  # sequence number, length
+
+    def __init__(self, filename, slots=256, slot_size=128):
+        """Open filename, creating it if it is missing or laid out differently.
+
+        :param filename: file to store the ring in.
+        :param slots: number of records to keep.
+        :param slot_size: bytes per record, including a 6 byte header.
+        """
+        self.filename = filename
+        self.slots = slots
+        self.slot_size = slot_size
+        self._header_size = struct.calcsize(self.HEADER)
+        self._slot_header_size = struct.calcsize(self.SLOT_HEADER)
+        self._blank_header = b"\xff" * self._slot_header_size
+        self.seq = 0
+        self._f = None
+        try:
+            self._open()
+        except (OSError, ValueError):
+            self.close()
+            self.seq = 0
+            self._create()
+
+    def _header(self):
+        return struct.pack(
+            self.HEADER, self.MAGIC, self.slot_size, self.slots, self.seq
+        )
+
+    def _open(self):
+        self._f = open(self.filename, "r+b")
+        header = self._f.read(self._header_size)
+        if len(header) != self._header_size:
+            raise ValueError("Truncated header")
+        magic, slot_size, slots, self.seq = struct.unpack(self.HEADER, header)
+        if (magic, slot_size, slots) != (self.MAGIC, self.slot_size, self.slots):
+            raise ValueError("Different layout")
+        # the header is written after the slot, so may be behind
+        while self._slot_seq(self.seq) == self.seq:
+            self.seq += 1
+
+    def _create(self):
+        with open(self.filename, "wb") as f:
+            f.write(self._header())
+            blank = b"\xff" * self.slot_size  # matches no sequence number
+            for _ in range(self.slots):
+                f.write(blank)
+        self._f = open(self.filename, "r+b")
+
+    def _offset(self, seq):
+        return self._header_size + (seq % self.slots) * self.slot_size
+
+    def _slot_seq(self, seq):
+        self._f.seek(self._offset(seq))
+        header = self._f.read(self._slot_header_size)
+        if len(header) != self._slot_header_size:
+            return None
+        return struct.unpack(self.SLOT_HEADER, header)[0]
+
+    @property
+    def first(self):
+        """Sequence number of the oldest record held."""
+        return max(self.seq - self.slots, 0)
+
+    def append(self, data):
+        """Append data, truncated to fit a slot, and return its sequence number."""
+        data = data[: self.slot_size - self._slot_header_size]
+        offset = self._offset(self.seq)
+        # Invalidate the slot and write the payload, then the slot header, so
+        # a slot is only ever taken as valid once its payload is complete.
+        self._f.seek(offset)
+        self._f.write(self._blank_header)
+        self._f.write(data)
+        self._f.seek(offset)
+        self._f.write(struct.pack(self.SLOT_HEADER, self.seq, len(data)))
+        self.seq += 1
+        self._f.seek(0)
+        self._f.write(self._header())
+        self._f.flush()
+        return self.seq - 1
+
+    def read(self, seq, size=None):
+        """Return record seq, or None if it has been overwritten or not written.
+
+        :param size: read at most this many bytes, e.g. just a record header.
+        """
+        if not self.first <= seq < self.seq:
+            return None
+        self._f.seek(self._offset(seq))
+        header = self._f.read(self._slot_header_size)
+        s, n = struct.unpack(self.SLOT_HEADER, header)
+        if s != seq:
+            return None
+        return self._f.read(n if size is None else min(n, size))
+
+    def records(self, since=None, until=None):
+        """Yield (seq, data) for records from since up to but excluding until."""
+        start = self.first if since is None else max(since, self.first)
+        end = self.seq if until is None else min(until, self.seq)
+        for seq in range(start, end):
+            data = self.read(seq)
+            if data is not None:
+                yield seq, data
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
@@ -5,6 +5,11 @@ import time
 import math
 import machine
 
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
 def _mode_in(pin):
     pin.init(mode=machine.Pin.IN)
 
@@ -41,6 +46,10 @@ class CRC():
                21, 59, 10, 89, 104, 255, 206, 157, 172]
 
 class SHT1x:
+    # nominal conversion times in ms, keyed by resolution in bits
+    CONVERSION_MS = {14: 320, 12: 80, 8: 20}
+    POLL_MS = 10
+
     Commands = {'Temperature': 0b00000011,
                 'Humidity': 0b00000101,
                 'ReadStatusRegister': 0b00000111,
@@ -51,7 +60,7 @@ class SHT1x:
     VDD = {'5V': 5, '4V': 4, '3.5V': 3.5, '3V': 3, '2.5V': 2.5}
 
     def __init__(self, data_pin, sck_pin, vdd='3.5V', resolution='HIGH',
-                 heater=False, otp_no_reload=False, crc_check=True):
+                 heater=False, otp_no_reload=False, crc_check=True, timeout_ms=500, retries=2):
         self.data_pin = data_pin
         self.sck_pin = sck_pin
         self.vdd = self.VDD.get(vdd.upper(), self.VDD['3.5V'])
@@ -59,6 +68,8 @@ class SHT1x:
         self._heater = heater
         self._otp_no_reload = otp_no_reload
         self.crc_check = crc_check
+        self.timeout_ms = timeout_ms
+        self.retries = retries
         self._command = self.Commands['NoOp']
         self._status_register = 0b00000000
         self.temperature_celsius = None
@@ -126,14 +137,7 @@ class SHT1x:
         """
         self._command = self.Commands['Temperature']
         self._send_command()
-        raw_temperature = self._read_measurement()
-
-        self.temperature_celsius = round(raw_temperature * COF.D2_SO_C[self._resolution[0]] +
-                                         COF.D1_VDD_C[self.vdd], 2)
-        self.temperature_fahrenheit = round(raw_temperature * COF.D2_SO_F[self._resolution[0]] +
-                                            COF.D1_VDD_F[self.vdd], 2)
-
-        return self.temperature_celsius
+        return self._convert_temperature(self._read_measurement())
 
     def read_humidity(self, temperature=None):
         """
@@ -152,8 +156,70 @@ class SHT1x:
 
         self._command = self.Commands['Humidity']
         self._send_command()
-        raw_humidity = self._read_measurement()
+        return self._convert_humidity(self._read_measurement(), temperature)
+
+    async def aread_temperature(self):
+        """
+        Awaitable version of read_temperature. Yields to the event loop while the sensor converts, and retries
+        up to `retries` times (resetting the connection in between) if the measurement fails or times out.
+        :return: Temperature in celsius.
+        """
+        raw_temperature = await self._ameasure('Temperature', self._resolution[0])
+        return self._convert_temperature(raw_temperature)
+
+    async def aread_humidity(self, temperature=None):
+        """
+        Awaitable version of read_humidity, with the same timeout and retry policy as aread_temperature.
+        :param temperature: Optional, temperature, in celsius, used for compensation.
+        :return: Humidity.
+        """
+        if temperature is None:
+            if self.temperature_celsius is None:
+                await self.aread_temperature()
+            temperature = self.temperature_celsius
 
+        raw_humidity = await self._ameasure('Humidity', self._resolution[1])
+        return self._convert_humidity(raw_humidity, temperature)
+
+    async def _ameasure(self, command, bits):
+        """
+        Runs a measurement command without blocking, retrying on failure.
+        :param command: Name of the measurement command.
+        :param bits: Resolution of the measurement, used to estimate the conversion time.
+        :return: 16-bit value.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                self._command = self.Commands[command]
+                self._send_command(wait=False)
+                await self._await_result(self.CONVERSION_MS.get(bits, self.timeout_ms))
+                return self._read_measurement()
+            except SHT1xError:
+                if attempt == self.retries:
+                    raise
+                self.reset_connection()
+                await asyncio.sleep_ms(self.POLL_MS)
+
+    def _convert_temperature(self, raw_temperature):
+        """
+        Converts a raw reading to temperature, storing the result on the object.
+        :param raw_temperature: 16-bit value read from the sensor.
+        :return: Temperature in celsius.
+        """
+        self.temperature_celsius = round(raw_temperature * COF.D2_SO_C[self._resolution[0]] +
+                                         COF.D1_VDD_C[self.vdd], 2)
+        self.temperature_fahrenheit = round(raw_temperature * COF.D2_SO_F[self._resolution[0]] +
+                                            COF.D1_VDD_F[self.vdd], 2)
+
+        return self.temperature_celsius
+
+    def _convert_humidity(self, raw_humidity, temperature):
+        """
+        Converts a raw reading to temperature compensated humidity, storing the result on the object.
+        :param raw_humidity: 16-bit value read from the sensor.
+        :param temperature: Temperature, in celsius, used to compensate.
+        :return: Humidity.
+        """
         linear_humidity = COF.C1_SO[self._resolution[1]] + (COF.C2_SO[self._resolution[1]] * raw_humidity) + (
             COF.C3_SO[self._resolution[1]] * raw_humidity ** 2)
 
@@ -193,13 +259,14 @@ class SHT1x:
 
         return self.dew_point
 
-    def _send_command(self, measurement=True):
+    def _send_command(self, measurement=True, wait=True):
         """
         Sends the given command to the SHT1x sensor and verifies acknowledgement. If the command is for
-        taking a measurement it will also ensure that the measurement is taking place and waits for the
-        measurement to complete.
+        taking a measurement it will also ensure that the measurement is taking place and, unless `wait` is
+        False, waits for the measurement to complete.
 
         :param measurement: Indicates if the command is for taking a measurement for temperature or humidity.
+        :param wait: Block until the measurement is complete.
         :return: None.
         """
         command_name = [key for key in self.Commands.keys() if self.Commands[key] == self._command]
@@ -215,7 +282,8 @@ class SHT1x:
             if ack == 0:
                 raise SHT1xError('SHT1x is not in the proper measurement state: DATA line is LOW.')
 
-            self._wait_for_result()
+            if wait:
+                self._wait_for_result()
 
     def _wait_for_result(self):
         """
@@ -239,6 +307,23 @@ class SHT1x:
         if data_ready == 1:
             raise SHT1xError('Sensor has not completed measurement after max time allotment.\n{0}'.format(self))
 
+    async def _await_result(self, expected_ms):
+        """
+        Waits for the sensor to complete measurement without blocking the event loop. Sleeps for the nominal
+        conversion time, then polls the Data Ready signal every POLL_MS until `timeout_ms` has elapsed.
+        :param expected_ms: Nominal conversion time for this measurement.
+        :return: None
+        """
+        _mode_in(self.data_pin)
+        waited = min(expected_ms, self.timeout_ms)
+        await asyncio.sleep_ms(waited)
+
+        while self.data_pin.value():
+            if waited >= self.timeout_ms:
+                raise SHT1xError('Sensor has not completed measurement after {0}ms.\n{1}'.format(waited, self))
+            await asyncio.sleep_ms(self.POLL_MS)
+            waited += self.POLL_MS
+
     def _read_measurement(self):
         """
         Reads the measurement data from the SHT1x sensor. If crc_check is set to True the CRC value